@@ -0,0 +1,122 @@
+import base64
+import hashlib
+import io
+import json
+import os
+import zipfile
+
+import numpy as np
+from joblib import dump, load
+
+from disk_cache import DiskLRU, MemoryLRU
+
+artifact_version = 2
+manifest_member = 'manifest.json'
+model_member = 'model.joblib'
+labels_member = 'labels.npy'
+points_member = 'points.npy'
+datasets_prefix = '_datasets/'
+
+
+def dataset_copy_name(md5_hex):
+    return f"{datasets_prefix}{md5_hex}.csv"
+
+def store_dataset_copy(bucket, csv_bytes):
+    """Upload CSV bytes once under their content hash and return the copy's name."""
+    name = dataset_copy_name(hashlib.md5(csv_bytes).hexdigest())
+    blob = bucket.blob(name)
+    if not blob.exists():
+        blob.upload_from_string(csv_bytes, content_type = 'text/csv')
+    return name
+
+def copy_stored_dataset(bucket, source_blob):
+    """Server-side copy of a stored dataset under its content hash, so later overwrites cannot change it."""
+    if source_blob.md5_hash:
+        md5_hex = base64.b64decode(source_blob.md5_hash).hex()
+    else:
+        md5_hex = hashlib.md5(source_blob.download_as_bytes()).hexdigest()
+    name = dataset_copy_name(md5_hex)
+    if not bucket.blob(name).exists():
+        # copy the generation that was hashed, not whatever has been uploaded since
+        source_blob.bucket.copy_blob(source_blob, bucket, name, source_generation = source_blob.generation)
+    return name
+
+def write_artifact(manifest, model, arrays = None):
+    """A version 2 artifact: manifest first, then uncompressed members that read back as raw byte ranges."""
+    manifest = dict(manifest, version = artifact_version, model_member = model_member)
+    model_buffer = io.BytesIO()
+    dump(model, model_buffer)
+
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zf:
+        zf.writestr(manifest_member, json.dumps(manifest))
+        zf.writestr(model_member, model_buffer.getvalue())
+        for member, array in (arrays or {}).items():
+            array_buffer = io.BytesIO()
+            np.save(array_buffer, array, allow_pickle = False)
+            zf.writestr(member, array_buffer.getvalue())
+    zip_buffer.seek(0)
+    return zip_buffer
+
+# ranged reads while opening an artifact, so loading a model skips the members it does not need
+read_chunk_bytes = 1024 * 1024
+
+def open_artifact(blob):
+    return zipfile.ZipFile(blob.open('rb', chunk_size = read_chunk_bytes))
+
+def is_versioned(zf):
+    return manifest_member in zf.namelist()
+
+def read_manifest(zf):
+    manifest = json.loads(zf.read(manifest_member))
+    if manifest.get('version', 0) > artifact_version:
+        raise ValueError(f"artifact version {manifest['version']} is newer than this server supports")
+    return manifest
+
+def read_model(zf, manifest):
+    return load(io.BytesIO(zf.read(manifest['model_member'])))
+
+def read_array(zf, member):
+    return np.load(io.BytesIO(zf.read(member)), allow_pickle = False)
+
+
+class ArtifactCache:
+    """Parsed model artifacts keyed by blob name and generation.
+
+    A lookup costs one metadata request to learn the current generation.
+    A new upload changes the generation, so stale entries are never
+    served and simply age out. A miss opens the artifact with ranged
+    reads, so the parser only downloads the members it reads, and the
+    parsed value is written to a shared DiskLRU of joblib files with a
+    MemoryLRU on top, so a hit in either skips the download and the
+    parse.
+    """
+
+    def __init__(self, directory, max_disk_bytes, max_memory_bytes, parser):
+        self.files = DiskLRU(directory, max_disk_bytes, suffix = '.joblib')
+        self.memory = MemoryLRU(max_memory_bytes)
+        self.parser = parser
+
+    def key(self, blob):
+        return f"{blob.name}@{blob.generation}"
+
+    def load(self, blob):
+        key = self.key(blob)
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+
+        path = self.files.get(key)
+        if path is not None:
+            try:
+                value = load(path, mmap_mode = 'r')
+                self.memory.put(key, value, os.path.getsize(path))
+                return value
+            except (FileNotFoundError, EOFError):
+                self.files.discard(key)
+
+        with open_artifact(blob) as zf:
+            value = self.parser(zf, blob.name)
+        path = self.files.put(key, lambda temp_path: dump(value, temp_path))
+        self.memory.put(key, value, os.path.getsize(path))
+        return value
@@ -0,0 +1,40 @@
+import threading
+
+
+def route_kind(endpoint):
+    """The concurrency class of a view: long fits, model inference, or storage-bound calls."""
+    if not endpoint:
+        return None
+    if endpoint.startswith(('train_', 'search_')):
+        return 'train'
+    if endpoint.startswith('infer_'):
+        return 'infer'
+    if endpoint.startswith(('store_', 'save_', 'delete_', 'fetch_')) or endpoint == 'load_model':
+        return 'storage'
+    return None
+
+
+class RouteLimits:
+    """Caps how many requests of each kind one worker process runs at once.
+
+    Every request thread is otherwise interchangeable, so a burst of
+    synchronous fits can occupy all of them and leave inference queued
+    behind minutes of training. Each kind gets its own semaphore. A
+    request that cannot get a slot within wait_seconds is turned away
+    so the client can retry, rather than holding a connection open. A
+    limit of 0 leaves that kind unlimited.
+    """
+
+    def __init__(self, limits, wait_seconds):
+        self.limits = dict(limits)
+        self.wait_seconds = wait_seconds
+        self.slots = {kind: threading.BoundedSemaphore(limit) for kind, limit in self.limits.items() if limit > 0}
+
+    def acquire(self, kind):
+        slots = self.slots.get(kind)
+        return slots is None or slots.acquire(timeout = self.wait_seconds)
+
+    def release(self, kind):
+        slots = self.slots.get(kind)
+        if slots is not None:
+            slots.release()
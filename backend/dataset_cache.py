@@ -0,0 +1,350 @@
+import itertools
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import pyarrow as pa
+
+from disk_cache import DiskLRU
+
+cache_dir = os.getenv('LEARNING_RATE_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'learning_rate_cache'))
+dataset_cache_bytes = int(os.getenv('LEARNING_RATE_DATASET_CACHE_BYTES', str(2 * 1024 ** 3)))
+parse_chunk_rows = int(os.getenv('LEARNING_RATE_PARSE_CHUNK_ROWS', '50000'))
+_shared_cache = None
+
+def shared_dataset_cache():
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = DatasetCache(os.path.join(cache_dir, 'datasets'), dataset_cache_bytes, chunk_rows = parse_chunk_rows)
+    return _shared_cache
+
+
+class Conversion:
+    """One in-flight CSV parse, published chunk by chunk so concurrent readers can follow it.
+
+    Only readers that join before the first chunk is published can follow
+    the parse, and each chunk is dropped once every follower has read it.
+    A later reader waits for the finished file instead. Publishing waits
+    while a follower is max_backlog chunks behind, so the parse holds at
+    most that many chunks. A follower still that far behind after
+    lag_seconds is detached: it stops receiving chunks and reads the rest
+    from the finished file, so it cannot stall the parse for everyone.
+    """
+
+    def __init__(self, max_backlog = 4, lag_seconds = 10):
+        self.max_backlog = max_backlog
+        self.lag_seconds = lag_seconds
+        self.chunks = {}
+        self.published = 0
+        self.cursors = {}
+        self.detached = set()
+        self.follower_ids = itertools.count()
+        self.path = None
+        self.done = False
+        self.error = None
+        self.condition = threading.Condition()
+
+    def join(self):
+        with self.condition:
+            if self.published:
+                return None
+            follower = next(self.follower_ids)
+            self.cursors[follower] = 0
+            return follower
+
+    def publish(self, chunk):
+        with self.condition:
+            deadline = time.monotonic() + self.lag_seconds
+            while self.lagging():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    for follower in self.lagging():
+                        del self.cursors[follower]
+                        self.detached.add(follower)
+                    self.drop_consumed()
+                    break
+                self.condition.wait(remaining)
+            if self.cursors:
+                self.chunks[self.published] = chunk
+            self.published += 1
+            self.condition.notify_all()
+
+    def lagging(self):
+        return [follower for follower, index in self.cursors.items() if self.published - index >= self.max_backlog]
+
+    def finish(self, path = None, error = None):
+        with self.condition:
+            self.path = path
+            self.error = error
+            self.done = True
+            self.condition.notify_all()
+
+    def wait(self):
+        with self.condition:
+            while not self.done:
+                self.condition.wait()
+        if self.error is not None:
+            raise self.error
+        return self.path
+
+    def follow(self, follower):
+        """Chunks in parse order, ending early if the follower is detached for lagging."""
+        try:
+            while True:
+                with self.condition:
+                    if follower in self.detached:
+                        return
+                    index = self.cursors[follower]
+                    while index >= self.published and not self.done:
+                        self.condition.wait()
+                    if follower in self.detached:
+                        return
+                    if index < self.published:
+                        chunk = self.chunks[index]
+                        self.cursors[follower] = index + 1
+                        self.drop_consumed()
+                        # a publish may be waiting for this follower to catch up
+                        self.condition.notify_all()
+                    elif self.error is not None:
+                        raise self.error
+                    else:
+                        return
+                yield chunk
+        finally:
+            with self.condition:
+                self.cursors.pop(follower, None)
+                self.drop_consumed()
+                self.condition.notify_all()
+
+    def drop_consumed(self):
+        oldest = min(self.cursors.values(), default = self.published)
+        for index in [index for index in self.chunks if index < oldest]:
+            del self.chunks[index]
+
+
+def is_numeric(arrow_type):
+    return pa.types.is_integer(arrow_type) or pa.types.is_floating(arrow_type)
+
+def is_text(arrow_type):
+    return pa.types.is_string(arrow_type) or pa.types.is_large_string(arrow_type)
+
+def widened_type(current, new):
+    """The type a single read_csv would give a column that parsed as current so far and new in this chunk."""
+    if current.equals(new) or pa.types.is_null(new):
+        return current
+    if pa.types.is_null(current):
+        return new
+    if is_numeric(current) and is_numeric(new):
+        return pa.float64()
+    # numbers in some chunks and text in others make a text column, as in a single read
+    if is_text(current):
+        return current
+    return new if is_text(new) else pa.large_string()
+
+def conform_column(column, arrow_type):
+    if column.type.equals(arrow_type):
+        return column
+    if column.null_count == len(column):
+        return pa.nulls(len(column), arrow_type)
+    return column.cast(arrow_type)
+
+def conform(batch, schema):
+    columns = [conform_column(column, field.type) for column, field in zip(batch.columns, schema)]
+    return pa.RecordBatch.from_arrays(columns, schema = schema)
+
+def observed_schema(batch):
+    # a column with no values in this chunk says nothing about its type
+    return pa.schema([
+        field.with_type(pa.null()) if column.null_count == len(column) else field
+        for column, field in zip(batch.columns, batch.schema.remove_metadata())
+    ])
+
+
+class ArrowFileBuilder:
+    """Appends DataFrame chunks to an Arrow IPC file, widening column types as later chunks require.
+
+    Chunks are typed independently, so a column can parse as integers in
+    one chunk and floats or all-missing in another. When a chunk widens
+    a column, the batches written so far are streamed into a new file
+    with the wider schema, which happens at most a few times per file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.schema = None
+        self.sink = None
+        self.writer = None
+
+    def append(self, frame):
+        batch = pa.RecordBatch.from_pandas(frame, preserve_index = False)
+        # pandas metadata records one chunk's dtypes, which widening can make stale
+        observed = observed_schema(batch)
+        if self.schema is None:
+            self.open(observed)
+        else:
+            schema = pa.schema([
+                field.with_type(widened_type(field.type, new_field.type))
+                for field, new_field in zip(self.schema, observed)
+            ])
+            if not schema.equals(self.schema):
+                self.rewrite(schema)
+        self.writer.write_batch(conform(batch, self.schema))
+
+    def open(self, schema):
+        self.schema = schema
+        self.sink = pa.OSFile(self.path, 'wb')
+        self.writer = pa.ipc.new_file(self.sink, schema)
+
+    def rewrite(self, schema):
+        self.close()
+        previous_path = self.path + '.previous'
+        os.replace(self.path, previous_path)
+        try:
+            self.open(schema)
+            with pa.memory_map(previous_path, 'r') as source:
+                reader = pa.ipc.open_file(source)
+                for index in range(reader.num_record_batches):
+                    self.writer.write_batch(conform(reader.get_batch(index), schema))
+        finally:
+            os.remove(previous_path)
+
+    def finish(self):
+        if self.schema is None:
+            # a file with no rows still needs a readable, empty table
+            self.open(pa.schema([]))
+        if any(pa.types.is_null(field.type) for field in self.schema):
+            # columns that never held a value read back as floats, as read_csv gives them
+            self.rewrite(pa.schema([
+                field.with_type(pa.float64()) if pa.types.is_null(field.type) else field for field in self.schema
+            ]))
+        self.close()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.sink.close()
+            self.writer = None
+
+
+class DatasetCache:
+    """Uploaded CSVs converted once to uncompressed Arrow IPC files and memory-mapped on read.
+
+    Entries are keyed by blob name and generation, so a re-upload under the
+    same name is picked up on the next read without explicit invalidation.
+    A miss streams the blob straight into a chunked CSV parser on a
+    background thread. Concurrent misses for the same key share that one
+    download, and chunks() lets readers consume rows as they are parsed.
+    """
+
+    def __init__(self, directory, max_bytes, max_open_tables = 16, chunk_rows = 50000):
+        self.files = DiskLRU(directory, max_bytes, suffix = '.arrow')
+        self.max_open_tables = max_open_tables
+        self.chunk_rows = chunk_rows
+        self.open_tables = OrderedDict()
+        self.generations = {}
+        self.conversions = {}
+        self.lock = threading.Lock()
+
+    def key(self, blob):
+        return f"{blob.name}@{blob.generation}"
+
+    def table(self, blob, columns = None):
+        table = self.cached_table(blob)
+        if table is None:
+            table = self.open(self.conversion(blob).wait())
+        if columns is not None:
+            table = table.select(columns)
+        return table
+
+    def cached_table(self, blob):
+        key = self.key(blob)
+        path = self.files.get(key)
+        if path is None:
+            return None
+        self.generations[blob.name] = key
+        return self.open(path)
+
+    def chunks(self, blob):
+        """DataFrame chunks of the dataset, following an in-flight parse on a miss when it has not got going yet."""
+        table = self.cached_table(blob)
+        if table is None:
+            conversion, follower = self.start_conversion(blob, join = True)
+            if follower is not None:
+                rows = 0
+                for chunk in conversion.follow(follower):
+                    rows += len(chunk)
+                    yield chunk
+                if follower not in conversion.detached:
+                    return
+                table = self.open(conversion.wait()).slice(rows)
+            else:
+                table = self.open(conversion.wait())
+        for batch in table.to_batches(max_chunksize = self.chunk_rows):
+            yield batch.to_pandas()
+
+    def conversion(self, blob):
+        return self.start_conversion(blob)[0]
+
+    def start_conversion(self, blob, join = False):
+        key = self.key(blob)
+        with self.lock:
+            conversion = self.conversions.get(key)
+            started = conversion is not None
+            if not started:
+                conversion = self.conversions[key] = Conversion()
+            # joining before the parse thread starts lets the reader that caused the miss see every chunk
+            follower = conversion.join() if join else None
+        if not started:
+            threading.Thread(target = self.convert, args = (blob, key, conversion), daemon = True).start()
+        return conversion, follower
+
+    def frame(self, blob, columns = None):
+        return self.table(blob, columns).to_pandas()
+
+    def open(self, path):
+        with self.lock:
+            table = self.open_tables.get(path)
+            if table is not None:
+                self.open_tables.move_to_end(path)
+                return table
+
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        with self.lock:
+            self.open_tables[path] = table
+            while len(self.open_tables) > self.max_open_tables:
+                self.open_tables.popitem(last = False)
+        return table
+
+    def convert(self, blob, key, conversion):
+        try:
+            with blob.open('rb') as stream:
+                path = self.files.put(key, lambda temp_path: self.write(stream, temp_path, conversion))
+            self.generations[blob.name] = key
+            conversion.finish(path = path)
+        except Exception as e:
+            conversion.finish(error = e)
+        finally:
+            with self.lock:
+                self.conversions.pop(key, None)
+
+    def write(self, stream, temp_path, conversion):
+        # each chunk goes to disk as it is parsed, so a miss holds at most the followers' bounded backlog in memory
+        builder = ArrowFileBuilder(temp_path)
+        try:
+            for chunk in pd.read_csv(stream, chunksize = self.chunk_rows):
+                conversion.publish(chunk)
+                builder.append(chunk)
+            builder.finish()
+        finally:
+            builder.close()
+
+    def forget(self, name):
+        key = self.generations.pop(name, None)
+        if key is not None:
+            path = self.files.path(key)
+            with self.lock:
+                self.open_tables.pop(path, None)
+            self.files.discard(key)
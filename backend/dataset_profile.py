@@ -0,0 +1,153 @@
+import codecs
+import io
+
+import numpy as np
+import pandas as pd
+
+max_tracked_values = 1000
+
+
+class ColumnStats:
+    def __init__(self, name):
+        self.name = name
+        self.dtype = None
+        self.count = 0
+        self.null_count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+        self.values = set()
+        self.too_many_values = False
+
+    def add(self, series):
+        nulls = int(series.isna().sum())
+        self.null_count += nulls
+        values = series.dropna()
+        if values.empty:
+            return
+
+        kind = values.dtype.kind
+        if kind == 'b':
+            dtype = 'boolean'
+        elif kind in 'iu':
+            dtype = 'integer'
+        elif kind == 'f':
+            dtype = 'float'
+        else:
+            dtype = 'string'
+        self.merge_dtype(dtype)
+
+        if self.dtype in ('integer', 'float'):
+            self.add_numeric(values.to_numpy(dtype = np.float64))
+        else:
+            self.count += len(values)
+
+        if not self.too_many_values:
+            self.values.update(values.astype(str).unique().tolist())
+            if len(self.values) > max_tracked_values:
+                self.too_many_values = True
+                self.values = set()
+
+    def merge_dtype(self, dtype):
+        if self.dtype is None or self.dtype == dtype:
+            self.dtype = dtype
+        elif {self.dtype, dtype} == {'integer', 'float'}:
+            self.dtype = 'float'
+        else:
+            self.dtype = 'string'
+            self.min = self.max = None
+            self.mean = self.m2 = 0.0
+
+    def add_numeric(self, values):
+        # Chan et al. pairwise update, so batches merge without revisiting rows
+        batch_count = len(values)
+        batch_mean = float(values.mean())
+        batch_m2 = float(((values - batch_mean) ** 2).sum())
+        total = self.count + batch_count
+        delta = batch_mean - self.mean
+        self.mean += delta * batch_count / total
+        self.m2 += batch_m2 + delta ** 2 * self.count * batch_count / total
+        self.count = total
+
+        batch_min = float(values.min())
+        batch_max = float(values.max())
+        self.min = batch_min if self.min is None else min(self.min, batch_min)
+        self.max = batch_max if self.max is None else max(self.max, batch_max)
+
+    def summary(self):
+        summary = {
+            'name': self.name,
+            'dtype': self.dtype or 'empty',
+            'count': self.count,
+            'null_count': self.null_count,
+            'distinct': None if self.too_many_values else len(self.values)
+        }
+        if self.dtype in ('integer', 'float') and self.count:
+            summary.update({
+                'min': self.min,
+                'max': self.max,
+                'mean': self.mean,
+                'std': (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else 0.0
+            })
+        return summary
+
+
+class CsvProfiler:
+    """Schema, row count and per-column statistics built from CSV bytes fed in arbitrary chunks.
+
+    Only complete records are parsed. A newline ends a record only when the
+    quote count before it is even, so quoted fields may span lines and chunks.
+    """
+
+    def __init__(self, encoding = 'utf-8', batch_bytes = 4 * 1024 * 1024):
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors = 'replace')
+        self.batch_bytes = batch_bytes
+        self.pending = ''
+        self.columns = None
+        self.stats = None
+        self.row_count = 0
+
+    def feed(self, chunk):
+        self.pending += self.decoder.decode(chunk)
+        if len(self.pending) < self.batch_bytes:
+            return
+
+        end = self.pending.rfind('\n')
+        while end != -1 and self.pending.count('"', 0, end) % 2:
+            end = self.pending.rfind('\n', 0, end)
+        if end == -1:
+            return
+
+        text, self.pending = self.pending[:end + 1], self.pending[end + 1:]
+        self.parse(text)
+
+    def close(self):
+        self.pending += self.decoder.decode(b'', final = True)
+        if self.pending.strip():
+            self.parse(self.pending)
+        self.pending = ''
+        return self.profile()
+
+    def parse(self, text):
+        if self.columns is None:
+            df = pd.read_csv(io.StringIO(text))
+            self.columns = [str(column) for column in df.columns]
+            self.stats = [ColumnStats(column) for column in self.columns]
+        else:
+            df = pd.read_csv(io.StringIO(text), header = None, names = self.columns)
+        self.add_frame(df)
+
+    def add_frame(self, df):
+        if self.columns is None:
+            self.columns = [str(column) for column in df.columns]
+            self.stats = [ColumnStats(column) for column in self.columns]
+        self.row_count += len(df)
+        for stats, column in zip(self.stats, df.columns):
+            stats.add(df[column])
+
+    def profile(self):
+        return {
+            'row_count': self.row_count,
+            'columns': [stats.summary() for stats in self.stats or []]
+        }
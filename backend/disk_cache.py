@@ -0,0 +1,143 @@
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class DiskLRU:
+    """Byte-budgeted directory of cache files, evicted least recently used first.
+
+    Several worker processes may share one directory. Each keeps its own
+    recency index, seeded from file mtimes, and hits bump the mtime so the
+    other processes see them.
+    """
+
+    def __init__(self, directory, max_bytes, suffix = ''):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        os.makedirs(directory, exist_ok = True)
+
+        existing = []
+        for file_name in os.listdir(directory):
+            if not file_name.endswith(suffix) or file_name.startswith('.'):
+                continue
+            try:
+                stat = os.stat(os.path.join(directory, file_name))
+            except FileNotFoundError:
+                continue
+            existing.append((stat.st_mtime, file_name, stat.st_size))
+        for _, file_name, size in sorted(existing):
+            self.entries[file_name] = size
+        self.total_bytes = sum(self.entries.values())
+
+    def file_name(self, key):
+        return hashlib.sha1(key.encode()).hexdigest() + self.suffix
+
+    def path(self, key):
+        return os.path.join(self.directory, self.file_name(key))
+
+    def get(self, key):
+        file_name = self.file_name(key)
+        path = os.path.join(self.directory, file_name)
+        with self.lock:
+            try:
+                os.utime(path)
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                self.total_bytes -= self.entries.pop(file_name, 0)
+                return None
+            if file_name not in self.entries:
+                self.entries[file_name] = size
+                self.total_bytes += size
+            self.entries.move_to_end(file_name)
+        return path
+
+    def put(self, key, write):
+        file_name = self.file_name(key)
+        path = os.path.join(self.directory, file_name)
+        fd, temp_path = tempfile.mkstemp(dir = self.directory, prefix = '.tmp-')
+        os.close(fd)
+        try:
+            write(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        size = os.path.getsize(path)
+        with self.lock:
+            self.total_bytes += size - self.entries.pop(file_name, 0)
+            self.entries[file_name] = size
+            self.evict(keep = file_name)
+        return path
+
+    def discard(self, key):
+        file_name = self.file_name(key)
+        with self.lock:
+            self.total_bytes -= self.entries.pop(file_name, 0)
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except FileNotFoundError:
+                pass
+
+    def evict(self, keep = None):
+        for file_name in list(self.entries):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if file_name == keep:
+                continue
+            self.total_bytes -= self.entries.pop(file_name)
+            try:
+                os.remove(os.path.join(self.directory, file_name))
+            except FileNotFoundError:
+                pass
+
+
+class MemoryLRU:
+    """Byte-budgeted in-memory map, evicted least recently used first.
+
+    Callers give each value's size, usually that of the file it was
+    loaded from. The newest entry is always kept, even when it alone is
+    over budget.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.entries
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, value, size):
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self.entries[key] = (value, size)
+            self.total_bytes += size
+
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                _, (_, evicted_size) = self.entries.popitem(last = False)
+                self.total_bytes -= evicted_size
+
+    def discard(self, key):
+        with self.lock:
+            entry = self.entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
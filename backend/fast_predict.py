@@ -0,0 +1,171 @@
+import threading
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.ensemble import GradientBoostingRegressor, HistGradientBoostingRegressor, RandomForestClassifier
+from sklearn.linear_model import LinearRegression, LogisticRegression, SGDClassifier
+
+from tree_export import boosting_trees, tree_arrays
+
+
+class Predictor:
+    """Scores one feature mapping without pandas or sklearn input validation.
+
+    The row is written into a preallocated per-thread buffer in the
+    model's fitted feature order, so callers may send features in any
+    order. Models without feature names, or rows with missing or
+    non-numeric values, raise and the caller falls back to model.predict.
+    """
+
+    def __init__(self, feature_names):
+        self.feature_names = list(feature_names)
+        self.local = threading.local()
+
+    def row(self, features):
+        row = getattr(self.local, 'row', None)
+        if row is None:
+            row = self.local.row = np.empty(len(self.feature_names))
+        for i, name in enumerate(self.feature_names):
+            row[i] = float(features[name])
+        return row
+
+
+class LinearPredictor(Predictor):
+    def __init__(self, model):
+        super().__init__(model.feature_names_in_)
+        self.coef = np.ascontiguousarray(model.coef_, dtype = np.float64).ravel()
+        self.intercept = float(model.intercept_)
+
+    def predict_one(self, features):
+        return [float(self.row(features) @ self.coef) + self.intercept]
+
+
+class LogisticPredictor(Predictor):
+    def __init__(self, model):
+        super().__init__(model.feature_names_in_)
+        self.coef = np.ascontiguousarray(model.coef_, dtype = np.float64)
+        self.intercept = np.asarray(model.intercept_, dtype = np.float64)
+        self.classes = model.classes_.tolist()
+
+    def predict_one(self, features):
+        scores = self.coef @ self.row(features) + self.intercept
+        if len(scores) == 1:
+            return [self.classes[int(scores[0] > 0)]]
+        return [self.classes[int(scores.argmax())]]
+
+
+class TreeEnsemble:
+    """Every tree's nodes concatenated into flat arrays and walked level by level for all trees at once.
+
+    Trees are given as tree_export.tree_arrays dicts. sklearn's own trees
+    compare float32-cast inputs, HistGradientBoosting compares float64
+    and routes NaNs by each node's missing_go_to_left.
+    """
+
+    def __init__(self, trees, dtype = np.float32):
+        self.dtype = dtype
+        offsets = np.cumsum([0] + [len(tree['children_left']) for tree in trees])
+        self.roots = offsets[:-1].astype(np.intp)
+        self.feature = np.concatenate([tree['feature'] for tree in trees]).astype(np.intp)
+        self.threshold = np.concatenate([tree['threshold'] for tree in trees])
+        self.left = np.concatenate([
+            np.where(tree['children_left'] == -1, -1, tree['children_left'] + offset)
+            for tree, offset in zip(trees, offsets)
+        ]).astype(np.intp)
+        self.right = np.concatenate([
+            np.where(tree['children_right'] == -1, -1, tree['children_right'] + offset)
+            for tree, offset in zip(trees, offsets)
+        ]).astype(np.intp)
+        self.missing_left = np.concatenate([
+            tree.get('missing_go_to_left', np.zeros(len(tree['children_left']), dtype = bool))
+            for tree in trees
+        ])
+        self.is_leaf = self.left == -1
+        self.feature[self.is_leaf] = 0
+
+    def leaves(self, row):
+        row = row.astype(self.dtype)
+        nodes = self.roots.copy()
+        while True:
+            internal = ~self.is_leaf[nodes]
+            if not internal.any():
+                return nodes
+            values = row[self.feature[nodes]]
+            go_left = (values <= self.threshold[nodes]) | (np.isnan(values) & self.missing_left[nodes])
+            nodes = np.where(internal, np.where(go_left, self.left[nodes], self.right[nodes]), nodes)
+
+
+class ForestPredictor(Predictor):
+    def __init__(self, model):
+        super().__init__(model.feature_names_in_)
+        self.ensemble = TreeEnsemble([tree_arrays(estimator) for estimator in model.estimators_])
+        values = np.concatenate([estimator.tree_.value[:, 0, :] for estimator in model.estimators_])
+        totals = values.sum(axis = 1, keepdims = True)
+        self.probabilities = np.divide(values, totals, out = np.zeros_like(values), where = totals > 0)
+        self.classes = model.classes_.tolist()
+
+    def predict_one(self, features):
+        leaves = self.ensemble.leaves(self.row(features))
+        return [self.classes[int(self.probabilities[leaves].mean(axis = 0).argmax())]]
+
+
+class GradientBoostingPredictor(Predictor):
+    def __init__(self, model):
+        super().__init__(model.feature_names_in_)
+        estimators = model.estimators_[:, 0]
+        self.ensemble = TreeEnsemble([tree_arrays(estimator) for estimator in estimators])
+        self.values = np.concatenate([estimator.tree_.value[:, 0, 0] for estimator in estimators]) * model.learning_rate
+        if model.init_ == 'zero':
+            self.baseline = 0.0
+        else:
+            self.baseline = float(np.ravel(model.init_.predict(np.zeros((1, model.n_features_in_))))[0])
+
+    def predict_one(self, features):
+        leaves = self.ensemble.leaves(self.row(features))
+        return [self.baseline + float(self.values[leaves].sum())]
+
+
+class HistGradientBoostingPredictor(Predictor):
+    def __init__(self, model):
+        super().__init__(model.feature_names_in_)
+        trees = [tree_arrays(tree) for tree in boosting_trees(model)]
+        self.ensemble = TreeEnsemble(trees, dtype = np.float64)
+        # leaf values are stored already shrunk by the learning rate
+        self.values = np.concatenate([tree['value'] for tree in trees])
+        self.baseline = float(np.ravel(model._baseline_prediction)[0])
+
+    def predict_one(self, features):
+        leaves = self.ensemble.leaves(self.row(features))
+        return [self.baseline + float(self.values[leaves].sum())]
+
+
+class KMeansPredictor(Predictor):
+    def __init__(self, model):
+        super().__init__(model.feature_names_in_)
+        self.centers = np.ascontiguousarray(model.cluster_centers_, dtype = np.float64)
+
+    def predict_one(self, features):
+        distances = ((self.centers - self.row(features)) ** 2).sum(axis = 1)
+        return [int(distances.argmin())]
+
+
+predictors = [
+    (LinearRegression, LinearPredictor),
+    (LogisticRegression, LogisticPredictor),
+    (SGDClassifier, LogisticPredictor),
+    (RandomForestClassifier, ForestPredictor),
+    (GradientBoostingRegressor, GradientBoostingPredictor),
+    (HistGradientBoostingRegressor, HistGradientBoostingPredictor),
+    (KMeans, KMeansPredictor),
+    (MiniBatchKMeans, KMeansPredictor)
+]
+
+def compile_predictor(model):
+    if isinstance(model, dict):
+        model = model.get('model')
+    if not hasattr(model, 'feature_names_in_'):
+        return None
+    for model_type, predictor_type in predictors:
+        if isinstance(model, model_type):
+            return predictor_type(model)
+    return None
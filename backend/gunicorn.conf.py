@@ -0,0 +1,24 @@
+import gc
+import os
+
+cpus = os.cpu_count() or 1
+
+bind = os.getenv('LEARNING_RATE_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('LEARNING_RATE_WEB_WORKERS', str(min(cpus, 4))))
+# threads keep storage calls and inference moving while a synchronous fit holds one of them
+worker_class = 'gthread'
+threads = int(os.getenv('LEARNING_RATE_WEB_THREADS', '8'))
+timeout = int(os.getenv('LEARNING_RATE_WEB_TIMEOUT', '600'))
+graceful_timeout = int(os.getenv('LEARNING_RATE_WEB_GRACEFUL_TIMEOUT', '60'))
+keepalive = 5
+
+# import sklearn, pandas and the preloaded models once in the master, shared copy-on-write by workers
+preload_app = True
+
+# every worker starts its own training pool on first use, so split the cores between them
+os.environ.setdefault('LEARNING_RATE_TRAIN_CPUS', str(max(1, cpus // workers)))
+
+
+def pre_fork(server, worker):
+    # objects allocated while preloading never get collected, so keep the collector from touching their pages
+    gc.freeze()
@@ -0,0 +1,349 @@
+import multiprocessing
+import os
+import pickle
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+
+from joblib import dump, load
+from threadpoolctl import threadpool_limits
+
+_worker_limits = None
+# a fit can report once per batch, so progress files are rewritten at most this often
+report_interval_seconds = 0.1
+
+def _init_worker(threads):
+    global _worker_limits
+    _worker_limits = threadpool_limits(limits = threads)
+
+def _run(fn, args, job_id, store):
+    context = JobContext(job_id, store)
+    # a progress file is how other processes tell a running job from a queued one
+    context.report(0.0)
+    return fn(*args, context = context)
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class JobStore:
+    """Job records, progress, cancel requests and results as files in a directory every worker process shares.
+
+    The process that submits a job owns it and writes its record when it
+    is submitted and when it finishes, along with the result. Fits report
+    progress and check for cancellation through the same directory, so a
+    poll, stream, cancel or result fetch can land on any worker.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok = True)
+
+    def path(self, job_id, suffix):
+        return os.path.join(self.directory, f"{job_id}{suffix}")
+
+    def replace(self, path, write):
+        fd, temp_path = tempfile.mkstemp(dir = self.directory, prefix = '.tmp-')
+        os.close(fd)
+        try:
+            write(temp_path)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def write(self, path, value):
+        def write_pickle(temp_path):
+            with open(temp_path, 'wb') as f:
+                pickle.dump(value, f)
+        self.replace(path, write_pickle)
+
+    def read(self, path):
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except (FileNotFoundError, EOFError):
+            return None
+
+    def save_record(self, record):
+        self.write(self.path(record['job_id'], '.job'), record)
+
+    def load_record(self, job_id):
+        return self.read(self.path(job_id, '.job'))
+
+    def report(self, job_id, progress):
+        self.write(self.path(job_id, '.progress'), progress)
+
+    def progress(self, job_id):
+        return self.read(self.path(job_id, '.progress'))
+
+    def request_cancel(self, job_id):
+        open(self.path(job_id, '.cancel'), 'w').close()
+
+    def cancel_requested(self, job_id):
+        return os.path.exists(self.path(job_id, '.cancel'))
+
+    def save_result(self, job_id, value):
+        self.replace(self.path(job_id, '.joblib'), lambda temp_path: dump(value, temp_path))
+
+    def load_result(self, job_id):
+        return load(self.path(job_id, '.joblib'))
+
+    def remove(self, job_id):
+        for suffix in ('.job', '.progress', '.cancel', '.joblib'):
+            try:
+                os.remove(self.path(job_id, suffix))
+            except FileNotFoundError:
+                pass
+
+
+class JobContext:
+    def __init__(self, job_id, store):
+        self.job_id = job_id
+        self.store = store
+        self.reported_at = None
+
+    def report(self, progress, **info):
+        now = time.monotonic()
+        if self.reported_at is not None and progress < 1 and now - self.reported_at < report_interval_seconds:
+            return
+        self.reported_at = now
+        self.store.report(self.job_id, dict(info, progress = progress))
+
+    def cancelled(self):
+        return self.store.cancel_requested(self.job_id)
+
+
+class Job:
+    def __init__(self, job_id, label, future, store, pooled = True):
+        self.job_id = job_id
+        self.label = label
+        self.future = future
+        self.store = store
+        self.pooled = pooled
+        self.submitted_at = time.time()
+        self.finished_at = None
+        self.discarded = False
+        self.result = None
+        self.error = None
+
+    @property
+    def cancel_requested(self):
+        return self.store.cancel_requested(self.job_id)
+
+    @property
+    def status(self):
+        if self.future.cancelled() or self.discarded:
+            return 'cancelled'
+        if self.finished_at is not None:
+            if self.error is None:
+                return 'succeeded'
+            # a fit that stops on a cancel request ends by raising
+            return 'cancelled' if self.cancel_requested else 'failed'
+        if self.cancel_requested:
+            return 'cancelling'
+        return 'running' if self.future.running() else 'queued'
+
+    def record(self):
+        return {
+            'job_id': self.job_id,
+            'label': self.label,
+            'pid': os.getpid(),
+            'submitted_at': self.submitted_at,
+            'finished_at': self.finished_at,
+            'status': self.status,
+            'error': self.error
+        }
+
+
+class SharedJob:
+    """A job owned by another worker process, read back from its record in the shared store."""
+
+    future = None
+
+    def __init__(self, record, store):
+        self.store = store
+        self.job_id = record['job_id']
+        self.label = record['label']
+        self.submitted_at = record['submitted_at']
+        self.finished_at = record['finished_at']
+        self.recorded_status = record['status']
+        self.error = record['error']
+        if self.finished_at is None and not process_alive(record['pid']):
+            self.finished_at = self.submitted_at
+            self.recorded_status = 'failed'
+            self.error = 'the worker process running this job exited'
+
+    @property
+    def cancel_requested(self):
+        return self.store.cancel_requested(self.job_id)
+
+    @property
+    def status(self):
+        if self.finished_at is not None:
+            return self.recorded_status
+        if self.cancel_requested:
+            return 'cancelling'
+        return 'running' if self.store.progress(self.job_id) is not None else 'queued'
+
+    @property
+    def result(self):
+        return self.store.load_result(self.job_id)
+
+
+class JobManager:
+    """Bounded process pool for long fits, with status, progress and cooperative cancellation.
+
+    Work runs in spawned processes, each limited to its share of the
+    machine's cores for BLAS/OpenMP threads, so the pool never
+    oversubscribes the box. Fits that run inline reserve cores from
+    whatever the pool's unfinished jobs leave free. Driver jobs, which
+    only coordinate pool work, run on threads in this process. Pool and
+    progress manager start lazily on the first submit, which keeps them
+    out of processes that never train. A manager inherited across a fork,
+    as in preloading web servers, starts its own pool in the child.
+
+    Job state is kept in a JobStore under directory, so the web worker
+    process that answers a status, result or cancel request need not be
+    the one that submitted the job.
+    """
+
+    def __init__(self, max_workers, directory, cpus = None, max_finished_jobs = 500):
+        self.max_workers = max(1, max_workers)
+        self.max_finished_jobs = max_finished_jobs
+        self.cpus = cpus or os.cpu_count() or 1
+        self.store = JobStore(directory)
+        self.reserved_cpus = 0
+        self.lock = threading.Lock()
+        self.jobs = OrderedDict()
+        self.executor = None
+        self.drivers = None
+        self.pid = None
+
+    def start(self):
+        if self.pid is not None and self.pid != os.getpid():
+            # the parent's jobs, pool and manager connections are unusable here
+            self.jobs.clear()
+            self.reserved_cpus = 0
+        self.pid = os.getpid()
+        context = multiprocessing.get_context('spawn')
+        threads = self.worker_threads()
+        self.executor = ProcessPoolExecutor(
+            max_workers = self.max_workers,
+            mp_context = context,
+            initializer = _init_worker,
+            initargs = (threads,)
+        )
+        self.drivers = ThreadPoolExecutor(max_workers = self.max_workers, thread_name_prefix = 'job-driver')
+
+    def worker_threads(self):
+        return max(1, self.cpus // self.max_workers)
+
+    @contextmanager
+    def reserve_cpus(self, wanted = None):
+        with self.lock:
+            active = sum(1 for job in self.jobs.values() if job.pooled and job.finished_at is None)
+            free = self.cpus - min(active, self.max_workers) * self.worker_threads() - self.reserved_cpus
+            granted = max(1, min(free, wanted or free))
+            self.reserved_cpus += granted
+        try:
+            yield granted
+        finally:
+            with self.lock:
+                self.reserved_cpus -= granted
+
+    def submit(self, label, fn, args, on_success = None):
+        return self.track(label, on_success, lambda job_id: (
+            self.executor.submit(_run, fn, args, job_id, self.store), True
+        ))
+
+    def submit_driver(self, label, fn, args, on_success = None):
+        return self.track(label, on_success, lambda job_id: (
+            self.drivers.submit(_run, fn, args, job_id, self.store), False
+        ))
+
+    def track(self, label, on_success, start_job):
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            if self.executor is None or self.pid != os.getpid():
+                self.start()
+            future, pooled = start_job(job_id)
+            job = Job(job_id, label, future, self.store, pooled)
+            self.jobs[job_id] = job
+            self.store.save_record(job.record())
+            self.prune()
+
+        def finish(future):
+            try:
+                if future.cancelled():
+                    return
+                value = future.result()
+                if job.cancel_requested:
+                    job.discarded = True
+                    return
+                job.result = on_success(value) if on_success else value
+                self.store.save_result(job_id, job.result)
+            except Exception as e:
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                self.store.save_record(job.record())
+
+        future.add_done_callback(finish)
+        return job_id
+
+    def get(self, job_id):
+        # ids come from clients, so only the hex ids handed out here ever reach the filesystem
+        if not job_id or not re.fullmatch('[0-9a-f]{32}', job_id):
+            return None
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        record = self.store.load_record(job_id)
+        return SharedJob(record, self.store) if record is not None else None
+
+    def describe(self, job):
+        progress = dict(self.store.progress(job.job_id) or {})
+        status = job.status
+        reported = progress.pop('progress', 0.0)
+        description = {
+            'job_id': job.job_id,
+            'label': job.label,
+            'status': status,
+            'progress': 1.0 if status == 'succeeded' else reported,
+            'submitted_at': job.submitted_at,
+            'finished_at': job.finished_at
+        }
+        if progress:
+            description['details'] = progress
+        if job.error is not None:
+            description['error'] = job.error
+        return description
+
+    def cancel(self, job):
+        # a finished job keeps its outcome; its model may already be registered and serving
+        if job.finished_at is not None or (job.future is not None and job.future.done()):
+            return job.status
+        self.store.request_cancel(job.job_id)
+        if job.future is not None:
+            job.future.cancel()
+        return job.status
+
+    def prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            self.jobs.pop(job_id)
+            self.store.remove(job_id)
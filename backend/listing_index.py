@@ -0,0 +1,155 @@
+import bisect
+import os
+import threading
+import time
+
+
+class ListingIndex:
+    """Sorted blob names for one bucket, served from memory and refreshed in the background.
+
+    The first lookup lists the bucket synchronously. After that a lookup
+    older than the TTL returns the current names immediately and starts
+    one background refresh. Writes and deletes made by this process are
+    applied at once, and replayed on top of any refresh that was already
+    listing when they happened.
+
+    With a stamp_path, every write also replaces a shared stamp file, and
+    each lookup stats it like the model registry checks its files. A
+    stamp changed by another worker process makes the lookup list the
+    bucket synchronously, so that worker's uploads and deletes show up
+    on the next request. Changes made outside the app still wait for the
+    TTL.
+    """
+
+    def __init__(self, list_names, ttl, excluded_prefixes = (), stamp_path = None):
+        self.list_names = list_names
+        self.ttl = ttl
+        self.excluded_prefixes = tuple(excluded_prefixes)
+        self.stamp_path = stamp_path
+        self.stamp = None
+        self.names = []
+        self.loaded_at = None
+        self.refreshing_pid = None
+        self.journal = None
+        self.lock = threading.Lock()
+        # one listing at a time, so a synchronous refresh never shares the journal with a background one
+        self.refresh_lock = threading.Lock()
+        if stamp_path:
+            os.makedirs(os.path.dirname(stamp_path), exist_ok = True)
+
+    def included(self, name):
+        return not name.startswith(self.excluded_prefixes)
+
+    def stamp_version(self):
+        if not self.stamp_path:
+            return None
+        try:
+            stat = os.stat(self.stamp_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def bump_stamp(self):
+        if not self.stamp_path:
+            return
+        seen = self.stamp_version()
+        temp_path = f"{self.stamp_path}.{os.getpid()}.{threading.get_ident()}"
+        with open(temp_path, 'w'):
+            pass
+        os.replace(temp_path, self.stamp_path)
+        with self.lock:
+            # only skip our own write; a stamp another process moved since our last lookup still forces a refresh
+            if seen == self.stamp:
+                self.stamp = self.stamp_version()
+
+    def refresh(self):
+        with self.refresh_lock:
+            # read before listing, so a write that lands during the listing triggers another refresh
+            stamp = self.stamp_version()
+            with self.lock:
+                self.journal = []
+            try:
+                names = sorted(name for name in self.list_names() if self.included(name))
+            except Exception:
+                with self.lock:
+                    self.journal = None
+                    self.refreshing_pid = None
+                raise
+
+            with self.lock:
+                for operation, name in self.journal:
+                    operation(names, name)
+                self.names = names
+                self.stamp = stamp
+                self.loaded_at = time.monotonic()
+                self.journal = None
+                self.refreshing_pid = None
+
+    def quiet_refresh(self):
+        try:
+            self.refresh()
+        except Exception:
+            pass
+
+    def current(self):
+        if self.loaded_at is None or self.stamp_version() != self.stamp:
+            self.refresh()
+            return self.names
+
+        with self.lock:
+            stale = time.monotonic() - self.loaded_at > self.ttl
+            # a refresh started before a fork never finishes in the child
+            start = stale and self.refreshing_pid != os.getpid()
+            if start:
+                self.refreshing_pid = os.getpid()
+            names = self.names
+        if start:
+            threading.Thread(target = self.quiet_refresh, daemon = True).start()
+        return names
+
+    def page(self, prefix = '', page_token = None, limit = None):
+        """Names starting with prefix after page_token, and the token for the next page or None."""
+        if limit is not None and limit < 1:
+            raise ValueError('limit must be a positive integer')
+        names = self.current()
+        start = bisect.bisect_left(names, prefix)
+        if page_token:
+            start = max(start, bisect.bisect_right(names, page_token))
+
+        page = []
+        for name in names[start:]:
+            if not name.startswith(prefix):
+                break
+            if limit is not None and len(page) == limit:
+                return page, page[-1]
+            page.append(name)
+        return page, None
+
+    def apply(self, operation, name):
+        if not self.included(name):
+            return
+        with self.lock:
+            # copy on write, so pages already handed out never change underneath their callers
+            names = list(self.names)
+            operation(names, name)
+            self.names = names
+            if self.journal is not None:
+                self.journal.append((operation, name))
+        self.bump_stamp()
+
+    def add(self, name):
+        self.apply(insert_name, name)
+
+    def remove(self, name):
+        self.apply(remove_name, name)
+
+
+def insert_name(names, name):
+    index = bisect.bisect_left(names, name)
+    if index == len(names) or names[index] != name:
+        names.insert(index, name)
+
+def remove_name(names, name):
+    index = bisect.bisect_left(names, name)
+    if index < len(names) and names[index] == name:
+        del names[index]
@@ -0,0 +1,127 @@
+import os
+import threading
+import weakref
+
+from joblib import dump, load
+
+from disk_cache import DiskLRU, MemoryLRU
+
+
+class RegisteredModel:
+    def __init__(self, model, version, size, predictor = None):
+        self.model = model
+        self.version = version
+        self.size = size
+        self.predictor = predictor
+
+    def predict_one(self, features):
+        if self.predictor is None:
+            return None
+        try:
+            return self.predictor.predict_one(features)
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+class ModelRegistry:
+    """Trained models keyed by session and algorithm, shared by every worker process.
+
+    Each put is written through to a joblib file in a shared local
+    directory, which is the source of truth across processes. Each process
+    keeps a byte-budgeted LRU of deserialized models on top of it and
+    checks the file's inode on every lookup, so a model retrained by
+    another worker is picked up and a memory miss costs a local load.
+    An optional compiler builds a fast single-row predictor whenever a
+    model enters memory.
+
+    A put can name an existing joblib file of the same model, such as a
+    training cache entry, which is hard-linked rather than written again.
+    Its identity lets every session registering that file share one
+    compiled predictor.
+    """
+
+    def __init__(self, directory, max_memory_bytes, max_disk_bytes, compiler = None):
+        self.compiler = compiler
+        self.files = DiskLRU(directory, max_disk_bytes, suffix = '.joblib')
+        self.memory = MemoryLRU(max_memory_bytes)
+        self.shared = weakref.WeakValueDictionary()
+        self.lock = threading.Lock()
+
+    def key(self, session_id, algo_name):
+        return f"{session_id}/{algo_name}"
+
+    def version(self, path):
+        stat = os.stat(path)
+        return (stat.st_ino, stat.st_size)
+
+    def put(self, session_id, algo_name, model, source_path = None, identity = None):
+        key = self.key(session_id, algo_name)
+        current = self.memory.get(key)
+        if current is not None and source_path is not None and current.version == self.source_version(source_path) and self.files.get(key):
+            # this session already serves that very file
+            return current.version
+
+        def write(temp_path):
+            if source_path is not None:
+                try:
+                    os.remove(temp_path)
+                    os.link(source_path, temp_path)
+                    return
+                except OSError:
+                    pass
+            dump(model, temp_path)
+
+        path = self.files.put(key, write)
+        version = self.version(path)
+        self.remember(key, self.register(model, version, identity))
+        return version
+
+    def source_version(self, path):
+        try:
+            return self.version(path)
+        except FileNotFoundError:
+            return None
+
+    def register(self, model, version, identity = None):
+        with self.lock:
+            shared = self.shared.get(identity) if identity is not None else None
+        if shared is not None:
+            return RegisteredModel(shared.model, version, version[1], shared.predictor)
+
+        predictor = self.compiler(model) if self.compiler else None
+        entry = RegisteredModel(model, version, version[1], predictor)
+        if identity is not None:
+            with self.lock:
+                self.shared[identity] = entry
+        return entry
+
+    def get(self, session_id, algo_name):
+        entry = self.entry(session_id, algo_name)
+        return entry.model if entry is not None else None
+
+    def entry(self, session_id, algo_name):
+        key = self.key(session_id, algo_name)
+        path = self.files.get(key)
+        if path is None:
+            self.forget(key)
+            return None
+
+        try:
+            version = self.version(path)
+        except FileNotFoundError:
+            self.forget(key)
+            return None
+
+        entry = self.memory.get(key)
+        if entry is not None and entry.version == version:
+            return entry
+
+        entry = self.register(load(path, mmap_mode = 'r'), version)
+        self.remember(key, entry)
+        return entry
+
+    def remember(self, key, entry):
+        self.memory.put(key, entry, entry.size)
+
+    def forget(self, key):
+        self.memory.discard(key)
@@ -0,0 +1,221 @@
+import base64
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+
+from google.cloud import storage
+from requests.adapters import HTTPAdapter
+
+_lock = threading.Lock()
+_backend = None
+_backend_pid = None
+
+
+def storage_setting():
+    return os.getenv('LEARNING_RATE_STORAGE', 'gcs')
+
+def uses_gcs():
+    return storage_setting() == 'gcs'
+
+def create_backend(setting):
+    if setting == 'gcs':
+        return GcsBackend(int(os.getenv('LEARNING_RATE_STORAGE_POOL_SIZE', '32')))
+    if setting.startswith('local:'):
+        return LocalBackend(setting[len('local:'):])
+    raise ValueError(f"unknown storage backend '{setting}', expected 'gcs' or 'local:<path>'")
+
+def backend():
+    """The storage backend for this process, rebuilt after a fork so children never share sockets."""
+    global _backend, _backend_pid
+    pid = os.getpid()
+    if _backend is None or _backend_pid != pid:
+        with _lock:
+            if _backend is None or _backend_pid != pid:
+                _backend = create_backend(storage_setting())
+                _backend_pid = pid
+    return _backend
+
+def bucket(bucket_name):
+    return backend().bucket(bucket_name)
+
+
+class GcsBackend:
+    """One storage client per process with a keep-alive connection pool.
+
+    Retries are left to the client library, which retries idempotent calls
+    and conditionally idempotent ones on connection errors, 429 and 5xx
+    responses. The pooled session adds none of its own, so uploads and
+    copies are never replayed underneath it. Bucket handles are cached,
+    so a request makes no setup calls at all.
+    """
+
+    def __init__(self, pool_size):
+        self.client = storage.Client()
+        adapter = HTTPAdapter(pool_connections = pool_size, pool_maxsize = pool_size, max_retries = 0)
+        # the client's authorized requests session is shared by every bucket and blob call
+        self.client._http.mount('https://', adapter)
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, bucket_name):
+        with self.lock:
+            handle = self.buckets.get(bucket_name)
+            if handle is None:
+                handle = self.buckets[bucket_name] = self.client.bucket(bucket_name)
+            return handle
+
+
+class LocalBackend:
+    """Buckets as directories under a root path, standing in for GCS in tests and benchmarks."""
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok = True)
+
+    def bucket(self, bucket_name):
+        return LocalBucket(self, bucket_name)
+
+
+class LocalBucket:
+    """The subset of google.cloud.storage.Bucket the server uses."""
+
+    def __init__(self, backend, name):
+        self.backend = backend
+        self.name = name
+        self.directory = os.path.join(backend.root, name)
+
+    def blob(self, blob_name):
+        return LocalBlob(self, blob_name)
+
+    def get_blob(self, blob_name):
+        blob = LocalBlob(self, blob_name)
+        return blob if blob.exists() else None
+
+    def list_blobs(self, prefix = None, fields = None):
+        names = []
+        for directory, _, file_names in os.walk(self.directory):
+            for file_name in file_names:
+                if file_name.startswith('.upload-'):
+                    continue
+                name = os.path.relpath(os.path.join(directory, file_name), self.directory).replace(os.sep, '/')
+                if not prefix or name.startswith(prefix):
+                    names.append(name)
+        return [LocalBlob(self, name) for name in sorted(names)]
+
+    def copy_blob(self, blob, destination_bucket, new_name = None, source_generation = None):
+        if source_generation is not None and os.stat(blob.path).st_mtime_ns != source_generation:
+            raise FileNotFoundError(f"generation {source_generation} of '{blob.name}' no longer exists")
+        copy = destination_bucket.blob(new_name or blob.name)
+        copy.upload_from_filename(blob.path)
+        return copy
+
+
+class LocalBlob:
+    """The subset of google.cloud.storage.Blob the server uses, with generation taken from the file's mtime."""
+
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+        self.path = os.path.join(bucket.directory, *name.split('/'))
+        self.generation = None
+        self.size = None
+        self.reload_if_exists()
+
+    def reload_if_exists(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self.generation = None
+            self.size = None
+            return False
+        self.generation = stat.st_mtime_ns
+        self.size = stat.st_size
+        return True
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    @property
+    def md5_hash(self):
+        digest = hashlib.md5()
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return base64.b64encode(digest.digest()).decode()
+
+    def delete(self):
+        os.remove(self.path)
+
+    def writer(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok = True)
+        return LocalWriter(self)
+
+    def upload_from_file(self, file, content_type = None):
+        writer = self.writer()
+        try:
+            shutil.copyfileobj(file, writer)
+        except BaseException:
+            writer.discard()
+            raise
+        writer.close()
+
+    def upload_from_string(self, data, content_type = None):
+        if isinstance(data, str):
+            data = data.encode()
+        self.upload_from_file(io.BytesIO(data))
+
+    def upload_from_filename(self, filename, content_type = None):
+        with open(filename, 'rb') as file:
+            self.upload_from_file(file)
+
+    def download_to_file(self, file):
+        with open(self.path, 'rb') as source:
+            shutil.copyfileobj(source, file)
+
+    def download_to_filename(self, filename):
+        shutil.copyfile(self.path, filename)
+
+    def download_as_bytes(self, start = None, end = None):
+        with open(self.path, 'rb') as f:
+            f.seek(start or 0)
+            if end is None:
+                return f.read()
+            return f.read(end - (start or 0) + 1)
+
+    def open(self, mode = 'r', chunk_size = None, content_type = None):
+        if mode == 'rb':
+            return open(self.path, 'rb')
+        raise ValueError(f"unsupported mode '{mode}'")
+
+
+class LocalWriter(io.RawIOBase):
+    """Writes to a temporary file beside the blob and renames it into place on close, like a GCS upload."""
+
+    def __init__(self, blob):
+        self.blob = blob
+        descriptor, self.temp_path = tempfile.mkstemp(dir = os.path.dirname(blob.path), prefix = '.upload-')
+        self.file = os.fdopen(descriptor, 'wb')
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        return self.file.write(data)
+
+    def discard(self):
+        if self.closed:
+            return
+        self.file.close()
+        os.remove(self.temp_path)
+        super().close()
+
+    def close(self):
+        if self.closed:
+            return
+        self.file.close()
+        os.replace(self.temp_path, self.blob.path)
+        self.blob.reload_if_exists()
+        super().close()
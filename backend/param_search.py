@@ -0,0 +1,190 @@
+import math
+from concurrent.futures import FIRST_COMPLETED, wait
+
+import numpy as np
+from sklearn.metrics import accuracy_score, r2_score, silhouette_score
+
+import training
+
+# tunable parameters per algorithm, with the bounds the fitters accept: closed for
+# integers, and open below for floats, since a fraction or rate of 0 is never valid
+searchable = {
+    'random_forest': {'n_trees': ('int', 1, None), 'max_samples': ('float', 0, 1)},
+    'grad_boost_reg': {'n_trees': ('int', 1, None), 'learning_rate': ('float', 0, None), 'max_depth': ('int', 1, None)},
+    'k_means': {'n_clusters': ('int', 2, 8)}
+}
+
+def check_value(name, kind, low_bound, high_bound, value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"'{name}' values must be numbers")
+    high = high_bound if high_bound is not None else 'inf'
+    if kind == 'int':
+        if not isinstance(value, int):
+            raise ValueError(f"'{name}' values must be integers")
+        if value < low_bound or (high_bound is not None and value > high_bound):
+            raise ValueError(f"'{name}' values must lie within [{low_bound}, {high}]")
+        return value
+    if not low_bound < value or (high_bound is not None and value > high_bound):
+        raise ValueError(f"'{name}' values must lie within ({low_bound}, {high}]")
+    # sklearn reads an integer max_samples as a row count, so fractions always travel as floats
+    return float(value)
+
+def parse_space(algo_name, space):
+    """Validate a search space of {param: [choices]} or {param: {'low', 'high', 'log'}} entries."""
+    if not isinstance(space, dict) or not space:
+        raise ValueError('space must map parameter names to choices or ranges')
+
+    allowed = searchable[algo_name]
+    parsed = {}
+    for name, spec in space.items():
+        if name not in allowed:
+            raise ValueError(f"cannot search over '{name}', expected one of {sorted(allowed)}")
+        kind, low_bound, high_bound = allowed[name]
+
+        if isinstance(spec, list):
+            if not spec:
+                raise ValueError(f"'{name}' needs at least one choice")
+            parsed[name] = ('choice', [check_value(name, kind, low_bound, high_bound, value) for value in spec])
+        elif isinstance(spec, dict) and 'low' in spec and 'high' in spec:
+            low = check_value(name, kind, low_bound, high_bound, spec['low'])
+            high = check_value(name, kind, low_bound, high_bound, spec['high'])
+            if low > high:
+                raise ValueError(f"'{name}' low must not exceed high")
+            log = bool(spec.get('log', False))
+            if log and low <= 0:
+                raise ValueError(f"'{name}' needs a positive low for a log range")
+            parsed[name] = (kind, low, high, log)
+        else:
+            raise ValueError(f"'{name}' must be a list of choices or a {{low, high}} range")
+    return parsed
+
+def sample_value(spec, rng):
+    if spec[0] == 'choice':
+        return spec[1][rng.integers(len(spec[1]))]
+
+    kind, low, high, log = spec
+    if log:
+        value = math.exp(rng.uniform(math.log(low), math.log(high)))
+    else:
+        value = rng.uniform(low, high)
+    if kind == 'int':
+        return int(min(high, max(low, round(value))))
+    return float(value)
+
+def sample_candidates(space, n_candidates, rng):
+    candidates = []
+    seen = set()
+    # small discrete spaces run out of distinct draws, so stop after a bounded number of attempts
+    for _ in range(n_candidates * 20):
+        candidate = {name: sample_value(spec, rng) for name, spec in space.items()}
+        key = tuple(sorted(candidate.items()))
+        if key not in seen:
+            seen.add(key)
+            candidates.append(candidate)
+            if len(candidates) == n_candidates:
+                break
+    return candidates
+
+def schedule(n_candidates, n_rows, factor, min_rows):
+    """Training rows for each rung, growing by factor up to every row on the last one."""
+    n_rungs = 1
+    while factor ** n_rungs < n_candidates and n_rows // factor ** n_rungs >= min_rows:
+        n_rungs += 1
+    return [max(min_rows, n_rows // factor ** (n_rungs - 1 - rung)) for rung in range(n_rungs)]
+
+def split(n_rows, seed):
+    order = np.random.default_rng(seed).permutation(n_rows)
+    n_validation = max(1, n_rows // 5)
+    return order[n_validation:], order[:n_validation]
+
+def score(algo_name, model, df, params):
+    features = params['features']
+    if algo_name == 'k_means':
+        labels = model['model'].predict(df[features])
+        if len(np.unique(labels)) < 2:
+            return -1.0
+        return float(silhouette_score(df[features], labels, sample_size = min(len(df), 2000), random_state = 0))
+    if algo_name == 'random_forest':
+        return float(accuracy_score(df[params['target']], model.predict(df[features])))
+    return float(r2_score(df[params['target']], model.predict(df[features])))
+
+def score_candidate(algo_name, source, params, n_rows, seed, context = None):
+    df = training.load_source(source)
+    train_rows, validation_rows = split(len(df), seed)
+    model, _ = training.fitters[algo_name](df.iloc[train_rows[:n_rows]], dict(params, labels_only = True), context or training.NullContext())
+    return score(algo_name, model, df.iloc[validation_rows], params)
+
+def wait_for(job_manager, job_ids, context, on_done):
+    pending = {job_manager.get(job_id).future: job_id for job_id in job_ids}
+    while pending:
+        if context.cancelled():
+            for job_id in pending.values():
+                job_manager.cancel(job_manager.get(job_id))
+            raise RuntimeError('job cancelled')
+        done, _ = wait(pending, timeout = 0.5, return_when = FIRST_COMPLETED)
+        for future in done:
+            on_done(pending.pop(future), future)
+
+def run_search(job_manager, algo_name, source, params, space, settings, context):
+    """Successive halving over randomly sampled candidates, each rung fanned out across the training pool.
+
+    Every rung fits the surviving candidates on a nested subsample of the
+    training rows, scores them on a fixed validation split and keeps the
+    best 1 / factor of them. The winner is refit on the whole dataset and
+    returned as an ordinary training result.
+    """
+    rng = np.random.default_rng(settings['random_state'])
+    candidates = sample_candidates(space, settings['n_candidates'], rng)
+    n_rows = training.load_table(source, params['features']).num_rows
+    train_rows = len(split(n_rows, settings['random_state'])[0])
+    rows_per_rung = schedule(len(candidates), train_rows, settings['factor'], min(train_rows, settings['min_rows']))
+
+    alive = list(range(len(candidates)))
+    planned = sum(math.ceil(len(candidates) / settings['factor'] ** rung) for rung in range(len(rows_per_rung))) + 1
+    completed = 0
+    leaderboard = {}
+    errors = []
+
+    for rung, rows in enumerate(rows_per_rung):
+        job_ids = {}
+        for index in alive:
+            job_id = job_manager.submit(
+                f"{algo_name}_search",
+                score_candidate,
+                (algo_name, source, dict(params, **candidates[index]), rows, settings['random_state'])
+            )
+            job_ids[job_id] = index
+
+        def on_done(job_id, future):
+            nonlocal completed
+            completed += 1
+            index = job_ids[job_id]
+            try:
+                leaderboard[index] = {'params': candidates[index], 'score': future.result(), 'rung': rung, 'rows': rows}
+            except Exception as e:
+                errors.append(str(e))
+                leaderboard.pop(index, None)
+            ranked = sorted(leaderboard.values(), key = lambda entry: (entry['rung'], entry['score']), reverse = True)
+            context.report(completed / planned, rung = rung + 1, rungs = len(rows_per_rung), leaderboard = ranked[:settings['leaderboard_size']])
+
+        wait_for(job_manager, list(job_ids), context, on_done)
+
+        survivors = [index for index in alive if index in leaderboard and leaderboard[index]['rung'] == rung]
+        if not survivors:
+            raise ValueError(f"every candidate failed: {errors[0] if errors else 'no candidates'}")
+        survivors.sort(key = lambda index: leaderboard[index]['score'], reverse = True)
+        alive = survivors[:max(1, math.ceil(len(survivors) / settings['factor']))]
+
+    best = alive[0]
+    final = {}
+    final_job = job_manager.submit(f"{algo_name}_search", training.run, (algo_name, source, dict(params, **candidates[best])))
+    wait_for(job_manager, [final_job], context, lambda job_id, future: final.update(value = future.result()))
+
+    entry, result = final['value']
+    ranked = sorted(leaderboard.values(), key = lambda entry: (entry['rung'], entry['score']), reverse = True)
+    result['search'] = {
+        'best_params': candidates[best],
+        'best_score': leaderboard[best]['score'],
+        'leaderboard': ranked[:settings['leaderboard_size']]
+    }
+    return entry, result
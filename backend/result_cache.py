@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+
+from joblib import dump, load
+
+from disk_cache import DiskLRU, MemoryLRU
+
+
+class TrainingCache:
+    """Trained models and their response payloads, keyed by everything that determines the fit.
+
+    Keys hash the dataset fingerprint, algorithm and training parameters,
+    so a repeated request is answered without refitting. The model and
+    the payload are written to a shared DiskLRU as separate joblib files,
+    so the model registry can link the model file instead of writing it
+    again, with a MemoryLRU of loaded results on top.
+    """
+
+    def __init__(self, directory, max_memory_bytes, max_disk_bytes):
+        self.files = DiskLRU(directory, max_disk_bytes, suffix = '.joblib')
+        self.memory = MemoryLRU(max_memory_bytes)
+
+    def key(self, algo_name, fingerprint, params):
+        description = json.dumps({'algo': algo_name, 'dataset': fingerprint, 'params': params}, sort_keys = True, default = str)
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def entry_path(self, key):
+        """The joblib file holding the cached model, or None once it is evicted."""
+        return self.files.get(f"{key}/entry")
+
+    def get(self, key):
+        cached = self.memory.get(key)
+        if cached is not None:
+            return cached
+
+        entry_path = self.entry_path(key)
+        result_path = self.files.get(f"{key}/result")
+        if entry_path is None or result_path is None:
+            self.discard(key)
+            return None
+        try:
+            value = (load(entry_path, mmap_mode = 'r'), load(result_path))
+            size = os.path.getsize(entry_path) + os.path.getsize(result_path)
+        except (FileNotFoundError, EOFError):
+            self.discard(key)
+            return None
+        self.memory.put(key, value, size)
+        return value
+
+    def put(self, key, value):
+        entry, result = value
+        entry_path = self.files.put(f"{key}/entry", lambda temp_path: dump(entry, temp_path))
+        result_path = self.files.put(f"{key}/result", lambda temp_path: dump(result, temp_path))
+        self.memory.put(key, value, os.path.getsize(entry_path) + os.path.getsize(result_path))
+
+    def discard(self, key):
+        self.files.discard(f"{key}/entry")
+        self.files.discard(f"{key}/result")
+        self.memory.discard(key)
@@ -0,0 +1,80 @@
+import orjson
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from flask import Response, request
+
+json_mimetype = 'application/json'
+arrow_mimetype = 'application/vnd.apache.arrow.stream'
+
+# arrays are encoded natively and floats written in their shortest round-tripping form, keys sorted like jsonify
+json_options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS | orjson.OPT_SORT_KEYS
+
+
+def wants_arrow():
+    """True when the request's Accept header prefers an Arrow IPC stream over JSON."""
+    return request.accept_mimetypes.best_match([json_mimetype, arrow_mimetype]) == arrow_mimetype
+
+def records(frame):
+    """A DataFrame as a list of row dicts, built from whole columns rather than row by row."""
+    columns = [str(column) for column in frame.columns]
+    values = [frame.iloc[:, index].tolist() for index in range(len(columns))]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+def default(value):
+    if isinstance(value, pd.DataFrame):
+        return records(value)
+    if isinstance(value, pd.Series):
+        return value.tolist()
+    # arrays orjson cannot encode natively, such as object or non-contiguous ones
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def dumps(payload):
+    """Compact JSON bytes for a payload that may hold DataFrames and NumPy arrays at any depth."""
+    return orjson.dumps(payload, default = default, option = json_options)
+
+def columns_json(frame):
+    """A DataFrame as {column: [values]}, matching pyarrow's to_pydict layout."""
+    return dumps({str(column): frame.iloc[:, index].to_numpy() for index, column in enumerate(frame.columns)})
+
+def arrow_table(value):
+    if isinstance(value, pa.Table):
+        return value
+    return pa.Table.from_pandas(value, preserve_index = False)
+
+def arrow_bytes(table, metadata = None):
+    """An Arrow IPC stream of the table, with the metadata attached to its schema."""
+    table = arrow_table(table)
+    if metadata:
+        table = table.replace_schema_metadata(dict(table.schema.metadata or {}, **metadata))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+def arrow_response(table, status = 200, headers = None, metadata = None):
+    return Response(arrow_bytes(table, metadata), status = status, headers = headers, mimetype = arrow_mimetype)
+
+def respond(payload, status = 200, headers = None):
+    """Serialize a response payload, as an Arrow stream when the client asks for one and it carries a table.
+
+    The Arrow body holds the payload's DataFrame as record batches. The
+    rest of the payload travels as JSON in the schema metadata under
+    'payload', and the table's own key under 'table_key', so a client can
+    rebuild the JSON response exactly.
+    """
+    if isinstance(payload, dict) and wants_arrow():
+        table_key = next((key for key, value in payload.items() if isinstance(value, pd.DataFrame)), None)
+        if table_key is not None:
+            rest = {key: value for key, value in payload.items() if key != table_key}
+            metadata = {'payload': dumps(rest), 'table_key': str(table_key)}
+            return arrow_response(payload[table_key], status, headers, metadata)
+    return Response(dumps(payload), status = status, headers = headers, mimetype = json_mimetype)
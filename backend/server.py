@@ -1,21 +1,30 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request
 from flask_cors import CORS
-from google.cloud import storage
-from joblib import dump, load
-import zipfile
+from joblib import load
 import json
 from dotenv import load_dotenv
 import os
-import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression, LogisticRegression
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor
-from sklearn.cluster import KMeans
-from sklearn.tree import export_graphviz
-from PIL import Image
+import pandas as pd
 import io
-import pydotplus
 import base64
+import time
+import itertools
+from concurrency import RouteLimits, route_kind
+from dataset_cache import cache_dir, shared_dataset_cache
+from dataset_profile import CsvProfiler
+from jobs import JobManager
+from listing_index import ListingIndex
+from model_registry import ModelRegistry
+from result_cache import TrainingCache
+from fast_predict import compile_predictor
+from tree_render import TreeRenderCache, formats
+from tree_export import boosting_trees, tree_arrays, tree_structure
+import object_store
+import training
+import artifacts
+import param_search
+import serialization
 
 load_dotenv()
 
@@ -25,13 +34,285 @@ CORS(app)
 gcp_service_account = os.getenv('GOOGLE_APPLICATION_CREDENTIALS')
 if gcp_service_account:
     os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = gcp_service_account
-else:
+elif object_store.uses_gcs():
     raise RuntimeError('Failed to load the GCP credentials path from the .env file')
 
 gcp_files_bucket = 'learning_rate_files'
 gcp_models_bucket = 'learning_rate_models'
+gcp_profiles_prefix = '_profiles/'
+
+dataset_cache = shared_dataset_cache()
+
+max_streaming_clusters = int(os.getenv('LEARNING_RATE_MAX_STREAMING_CLUSTERS', '256'))
+batch_stream_rows = int(os.getenv('LEARNING_RATE_BATCH_STREAM_ROWS', '10000'))
+upload_chunk_size = int(os.getenv('LEARNING_RATE_UPLOAD_CHUNK_BYTES', str(8 * 1024 * 1024)))
+
+model_registry = ModelRegistry(
+    os.path.join(cache_dir, 'models'),
+    int(os.getenv('LEARNING_RATE_MODEL_MEMORY_BYTES', str(1024 ** 3))),
+    int(os.getenv('LEARNING_RATE_MODEL_DISK_BYTES', str(10 * 1024 ** 3))),
+    compiler = compile_predictor
+)
+
+training_cache = TrainingCache(
+    os.path.join(cache_dir, 'results'),
+    int(os.getenv('LEARNING_RATE_RESULT_CACHE_MEMORY_BYTES', str(256 * 1024 ** 2))),
+    int(os.getenv('LEARNING_RATE_RESULT_CACHE_DISK_BYTES', str(2 * 1024 ** 3)))
+)
+
+tree_render_cache = TreeRenderCache(int(os.getenv('LEARNING_RATE_RENDER_CACHE_BYTES', str(256 * 1024 ** 2))))
+# every cached render is one decoded and resized image, so a client cannot ask for an arbitrarily large one
+max_image_side = int(os.getenv('LEARNING_RATE_MAX_IMAGE_SIDE', '4096'))
+train_cpus = int(os.getenv('LEARNING_RATE_TRAIN_CPUS', str(os.cpu_count() or 1)))
+job_manager = JobManager(int(os.getenv('LEARNING_RATE_TRAIN_WORKERS', str(train_cpus))), os.path.join(cache_dir, 'jobs'), train_cpus)
+
+route_limits = RouteLimits(
+    {
+        'train': int(os.getenv('LEARNING_RATE_MAX_TRAIN_REQUESTS', '2')),
+        'infer': int(os.getenv('LEARNING_RATE_MAX_INFER_REQUESTS', '0')),
+        'storage': int(os.getenv('LEARNING_RATE_MAX_STORAGE_REQUESTS', '16'))
+    },
+    float(os.getenv('LEARNING_RATE_ROUTE_WAIT_SECONDS', '10'))
+)
+
+@app.before_request
+def limit_route():
+    kind = route_kind(request.endpoint) if request.method != 'OPTIONS' else None
+    if kind is None:
+        return
+    if not route_limits.acquire(kind):
+        return jsonify({'error': f"too many concurrent {kind} requests, retry shortly"}), 503, {'Retry-After': '1'}
+    g.route_kind = kind
+
+@app.after_request
+def release_route_on_close(response):
+    kind = g.pop('route_kind', None)
+    if kind is None:
+        return response
+    # a streamed body is iterated after the request context is gone, so hold the slot until the server closes it
+    if response.is_streamed:
+        response.call_on_close(lambda: route_limits.release(kind))
+    else:
+        route_limits.release(kind)
+    return response
+
+@app.teardown_request
+def release_route(error = None):
+    # only reached with the slot still held when the view raised and no response was built
+    kind = g.pop('route_kind', None)
+    if kind is not None:
+        route_limits.release(kind)
+
+def blob_names(bucket_name):
+    # names only, so a listing does not pull every blob's metadata
+    return (blob.name for blob in object_store.bucket(bucket_name).list_blobs(fields = 'items(name),nextPageToken'))
+
+listing_ttl = float(os.getenv('LEARNING_RATE_LISTING_TTL_SECONDS', '30'))
+data_listing = ListingIndex(
+    lambda: blob_names(gcp_files_bucket), listing_ttl, (gcp_profiles_prefix,),
+    os.path.join(cache_dir, 'listings', 'data.stamp')
+)
+model_listing = ListingIndex(
+    lambda: blob_names(gcp_models_bucket), listing_ttl, (artifacts.datasets_prefix,),
+    os.path.join(cache_dir, 'listings', 'models.stamp')
+)
+
+def listing_response(listing):
+    limit = request.args.get('limit')
+    if limit is not None and not (limit.isdigit() and int(limit) > 0):
+        return jsonify({'error': 'limit must be a positive integer'}), 400
+    names, next_page_token = listing.page(
+        prefix = request.args.get('prefix', ''),
+        page_token = request.args.get('page_token'),
+        limit = int(limit) if limit is not None else None
+    )
+    response = jsonify(names)
+    if next_page_token is not None:
+        response.headers['X-Next-Page-Token'] = next_page_token
+    return response, 200
+
+def get_dataset_blob(dataset_name):
+    bucket = object_store.bucket(gcp_files_bucket)
+    blob = bucket.get_blob(dataset_name)
+    if blob is None:
+        raise FileNotFoundError(f"dataset '{dataset_name}' not found")
+    return blob
+
+def load_dataset(dataset_name, columns = None):
+    return dataset_cache.frame(get_dataset_blob(dataset_name), columns)
+
+def tree_index_error(trees, tree_index):
+    # a 0 or negative index would otherwise wrap around to a tree at the end of the list
+    if not isinstance(tree_index, int) or not 1 <= tree_index <= len(trees):
+        return jsonify({'error': f"tree_index must be an integer between 1 and {len(trees)}"}), 400
+    return None
+
+def graph_response(algo_name, entry, trees, data, default_size):
+    image_format = data.get('format', 'base64')
+    if image_format not in formats:
+        return jsonify({'error': f"format must be one of {', '.join(formats)}"}), 400
+    size = (data.get('width', default_size[0]), data.get('height', default_size[1]))
+    if not all(isinstance(side, int) and 0 < side <= max_image_side for side in size):
+        return jsonify({'error': f"width and height must be integers between 1 and {max_image_side}"}), 400
+    tree_index = data.get('tree_index')
+    error = tree_index_error(trees, tree_index)
+    if error is not None:
+        return error
+
+    try:
+        model_key = (session_id(), algo_name, entry.version)
+        image = tree_render_cache.get(model_key, trees, tree_index, size, image_format)
+        if image_format == 'png':
+            return Response(image, mimetype = 'image/png')
+        if image_format == 'svg':
+            return Response(image, mimetype = 'image/svg+xml')
+        return jsonify({'image_base64': base64.b64encode(image).decode('utf-8')}), 200
+    except Exception as e:
+        print("Error generating image: ", str(e)) 
+        return jsonify({'error': str(e)}), 500
+
+def tree_response(entry, trees, data):
+    tree_index = data.get('tree_index')
+    error = tree_index_error(trees, tree_index)
+    if error is not None:
+        return error
+    root = data.get('root', 0)
+    max_depth = data.get('max_depth')
+    if not isinstance(root, int) or root < 0 or (max_depth is not None and (not isinstance(max_depth, int) or max_depth < 0)):
+        return jsonify({'error': 'root and max_depth must be non-negative integers'}), 400
+
+    try:
+        structure = tree_structure(tree_arrays(trees[tree_index - 1]), root = root, max_depth = max_depth)
+        structure['feature_names'] = list(entry.model.feature_names_in_)
+        return jsonify(structure), 200
+    except IndexError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def dataset_source(data):
+    dataset_name = data.get('dataset_name')
+    if dataset_name:
+        return ('blob', gcp_files_bucket, dataset_name)
+    return ('frame', pd.DataFrame(data.get('dataset')))
+
+def has_dataset(data):
+    return bool(data.get('dataset_name') or data.get('dataset'))
+
+def session_id():
+    data = request.get_json(silent = True) or {}
+    return request.headers.get('X-Session-Id') or data.get('session_id') or request.args.get('session_id') or 'default'
+
+def get_model(algo_name):
+    return model_registry.get(session_id(), algo_name)
+
+def get_entry(algo_name):
+    return model_registry.entry(session_id(), algo_name)
 
-trained_models = {}
+def require_model(algo_name):
+    model = get_model(algo_name)
+    if model is None:
+        raise KeyError(algo_name)
+    return model
+
+def register_trained(session, algo_name, value, cache_key = None):
+    entry, result = value
+    if cache_key is None:
+        model_registry.put(session, algo_name, entry)
+    else:
+        # link the cached model file rather than serializing and compiling the model again
+        model_registry.put(session, algo_name, entry, training_cache.entry_path(cache_key), cache_key)
+    return result
+
+def training_cache_key(algo_name, source, params, data):
+    # warm starts depend on the registered model, and n_jobs never changes the fit
+    if not data.get('cache', True) or 'warm_start_model' in params:
+        return None
+    key_params = {name: value for name, value in params.items() if name != 'n_jobs'}
+    return training_cache.key(algo_name, training.dataset_fingerprint(source), key_params)
+
+def register_result(cache_key, session, algo_name, value):
+    if cache_key is not None:
+        training_cache.put(cache_key, value)
+    return register_trained(session, algo_name, value, cache_key)
+
+def train(algo_name, data, params):
+    session = session_id()
+    source = dataset_source(data)
+    cache_key = training_cache_key(algo_name, source, params, data)
+    cached = training_cache.get(cache_key) if cache_key is not None else None
+
+    if data.get('async'):
+        if cached is not None:
+            # finish through the job API so async clients see the same contract
+            job_id = job_manager.submit_driver(
+                algo_name,
+                lambda context: cached,
+                (),
+                on_success = lambda value: register_trained(session, algo_name, value, cache_key)
+            )
+            return jsonify({'job_id': job_id}), 202
+        if 'n_jobs' in params:
+            params['n_jobs'] = min(params['n_jobs'] or job_manager.worker_threads(), job_manager.worker_threads())
+        job_id = job_manager.submit(
+            algo_name,
+            training.run,
+            (algo_name, source, params),
+            on_success = lambda value: register_result(cache_key, session, algo_name, value)
+        )
+        return jsonify({'job_id': job_id}), 202
+
+    if cached is not None:
+        return serialization.respond(register_trained(session, algo_name, cached, cache_key), headers = {'X-Cache': 'hit'})
+
+    if 'n_jobs' not in params:
+        result = register_result(cache_key, session, algo_name, training.run(algo_name, source, params))
+        return serialization.respond(result, headers = {'X-Cache': 'miss'})
+
+    with job_manager.reserve_cpus(params['n_jobs']) as n_jobs:
+        result = register_result(cache_key, session, algo_name, training.run(algo_name, source, dict(params, n_jobs = n_jobs)))
+    return serialization.respond(result, headers = {'X-Cache': 'miss'})
+
+def search(algo_name, data, params):
+    if not data.get('dataset_name'):
+        return jsonify({'error': 'dataset_name must be provided to search'}), 400
+
+    try:
+        space = param_search.parse_space(algo_name, data.get('space'))
+        settings = {
+            'n_candidates': int(data.get('n_candidates', 16)),
+            'factor': int(data.get('factor', 3)),
+            'min_rows': int(data.get('min_rows', 100)),
+            'random_state': int(data.get('random_state', 0)),
+            'leaderboard_size': int(data.get('leaderboard_size', 10))
+        }
+        if settings['n_candidates'] < 1 or settings['factor'] < 2 or settings['min_rows'] < 1:
+            raise ValueError('n_candidates and min_rows must be positive and factor at least 2')
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    session = session_id()
+    job_id = job_manager.submit_driver(
+        f"{algo_name}_search",
+        param_search.run_search,
+        (job_manager, algo_name, dataset_source(data), params, space, settings),
+        on_success = lambda value: register_trained(session, algo_name, value)
+    )
+    return jsonify({'job_id': job_id}), 202
+
+def profile_upload(file):
+    """Profile an uploaded CSV on the way through, or None if the profiler cannot read it."""
+    profiler = CsvProfiler()
+    try:
+        for chunk in iter(lambda: file.stream.read(upload_chunk_size), b''):
+            profiler.feed(chunk)
+        return profiler.close()
+    except Exception as e:
+        # profiles are computed on demand later, so a file the profiler rejects is still stored
+        app.logger.warning("skipped profiling '%s': %s", file.filename, e)
+        return None
+    finally:
+        file.stream.seek(0)
 
 @app.route('/store_data', methods = ['POST'])
 def store_data():
@@ -43,11 +324,23 @@ def store_data():
         return jsonify({'error': 'No selected file'}), 400
     
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(gcp_files_bucket)
+        bucket = object_store.bucket(gcp_files_bucket)
+
+        profile = profile_upload(file) if file.filename.endswith('.csv') else None
 
+        # the form parser has already spooled the whole file, so only a complete upload is ever committed
         blob = bucket.blob(file.filename)
-        blob.upload_from_string(file.read(), content_type=file.content_type)
+        blob.chunk_size = upload_chunk_size
+        blob.upload_from_file(file.stream, content_type = file.content_type)
+        dataset_cache.forget(file.filename)
+        data_listing.add(file.filename)
+
+        profile_blob = bucket.blob(gcp_profiles_prefix + file.filename + '.json')
+        if profile is not None:
+            profile_blob.upload_from_string(json.dumps(profile), content_type = 'application/json')
+        elif profile_blob.exists():
+            # never leave the previous upload's profile describing this one
+            profile_blob.delete()
 
         return jsonify({'message': 'File uploaded successfully'}), 200
     except Exception as e:
@@ -62,12 +355,16 @@ def delete_data():
         return jsonify({'error': 'No dataset name provided'}), 400
     
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(gcp_files_bucket)
+        bucket = object_store.bucket(gcp_files_bucket)
 
         blob = bucket.blob(dataset_name)
         if blob.exists():
             blob.delete()
+            dataset_cache.forget(dataset_name)
+            data_listing.remove(dataset_name)
+            profile_blob = bucket.blob(gcp_profiles_prefix + dataset_name + '.json')
+            if profile_blob.exists():
+                profile_blob.delete()
             return jsonify({'success': 'File deleted successfully'}), 200
         else:
             return jsonify({'error': 'File not found'}), 404
@@ -77,48 +374,150 @@ def delete_data():
 @app.route('/fetch_data_names', methods = ['GET'])
 def fetch_data_names():
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(gcp_files_bucket)
-        blobs = bucket.list_blobs()
-
-        file_names = [blob.name for blob in blobs]
-        return jsonify(file_names)
+        return listing_response(data_listing)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
-@app.route('/fetch_dataset', methods = ['GET'])
-def fetch_dataset():
+@app.route('/fetch_dataset_profile', methods = ['GET'])
+def fetch_dataset_profile():
     file_name = request.args.get('file_name')
     if not file_name:
         return jsonify({'error': 'no file name provided'}), 400
-    
-    temp_dir_path = '/tmp'
-    temp_file_path = os.path.join(temp_dir_path, file_name)
-    
+
     try:
-        if not os.path.exists(temp_dir_path):
-            os.makedirs(temp_dir_path)
+        bucket = object_store.bucket(gcp_files_bucket)
+        profile_blob = bucket.blob(gcp_profiles_prefix + file_name + '.json')
+        if profile_blob.exists():
+            return jsonify(json.loads(profile_blob.download_as_bytes())), 200
+
+        profiler = CsvProfiler()
+        profiler.add_frame(load_dataset(file_name))
+        profile = profiler.profile()
+        profile_blob.upload_from_string(json.dumps(profile), content_type = 'application/json')
+        return jsonify(profile), 200
+    except FileNotFoundError:
+        return jsonify({'error': 'file not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def stream_records(blob, columns, offset, limit):
+    """Rows of a dataset that is not cached yet, sent as they are parsed.
 
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(gcp_files_bucket)
-        blob = bucket.blob(file_name)
+    The first chunk is read before responding, so a file that fails to
+    parse at the start gets an ordinary error status. A failure after
+    that, when the 200 status is already sent, ends the body with an
+    {"error": ...} line where the closing bracket belongs, so the body
+    carries the reason and never parses as a complete array.
+    """
+    chunks = dataset_cache.chunks(blob)
+    try:
+        first = next(chunks, None)
+    except Exception:
+        chunks.close()
+        raise
+    if first is not None and columns:
+        missing = [column for column in columns if column not in first.columns]
+        if missing:
+            chunks.close()
+            return jsonify({'error': f"unknown columns: {', '.join(missing)}"}), 400
+
+    def generate():
+        yield b'['
+        position = 0
+        emitted = 0
+        separator = b''
+        try:
+            for chunk in itertools.chain([first] if first is not None else [], chunks):
+                start = max(offset - position, 0)
+                position += len(chunk)
+                rows = chunk.iloc[start:]
+                if limit is not None:
+                    rows = rows.iloc[:limit - emitted]
+                if columns:
+                    rows = rows[columns]
+                if len(rows):
+                    yield separator + serialization.dumps(rows)[1:-1]
+                    separator = b','
+                    emitted += len(rows)
+                if limit is not None and emitted >= limit:
+                    break
+        except Exception as e:
+            app.logger.warning("streaming '%s' failed: %s", blob.name, e)
+            yield b'\n' + serialization.dumps({'error': str(e)})
+            return
+        finally:
+            chunks.close()
+        yield b']'
+
+    return Response(generate(), mimetype = 'application/json')
 
-        blob.download_to_filename(temp_file_path)
+@app.route('/fetch_dataset', methods = ['GET'])
+def fetch_dataset():
+    file_name = request.args.get('file_name')
+    if not file_name:
+        return jsonify({'error': 'no file name provided'}), 400
+    
+    if not file_name.endswith('.csv'):
+        return jsonify({'error': 'file type not supported'}), 400
+
+    offset = request.args.get('offset', 0, type = int)
+    limit = request.args.get('limit', type = int)
+    columns = request.args.get('columns')
+    layout = request.args.get('layout', 'records')
+    if offset < 0 or (limit is not None and limit < 0):
+        return jsonify({'error': 'offset and limit must be non-negative'}), 400
+    if layout not in ('records', 'columns'):
+        return jsonify({'error': "layout must be 'records' or 'columns'"}), 400
+    if columns:
+        columns = columns.split(',')
 
-        if os.path.exists(temp_file_path):
-            if file_name.endswith('.csv'):
-                df = pd.read_csv(temp_file_path)
-                data = df.to_dict(orient = 'records')
-            else:
-                return jsonify({'error': 'file type not supported'}), 400
-            return jsonify(data)
+    try:
+        blob = get_dataset_blob(file_name)
+        table = dataset_cache.cached_table(blob)
+        if table is None and layout == 'records' and not serialization.wants_arrow():
+            return stream_records(blob, columns, offset, limit)
+        if table is None:
+            table = dataset_cache.table(blob)
+        if columns:
+            missing = [column for column in columns if column not in table.column_names]
+            if missing:
+                return jsonify({'error': f"unknown columns: {', '.join(missing)}"}), 400
+            table = table.select(columns)
+        total_rows = table.num_rows
+        table = table.slice(offset, limit)
+
+        headers = {'X-Total-Count': str(total_rows)}
+        if serialization.wants_arrow():
+            return serialization.arrow_response(table, headers = headers)
+        if layout == 'columns':
+            body = serialization.columns_json(table.to_pandas())
         else:
-            return jsonify({'error': 'file not found'}), 404
+            body = serialization.dumps(table.to_pandas())
+        return Response(body, headers = headers, mimetype = 'application/json')
+    except FileNotFoundError:
+        return jsonify({'error': 'file not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+
+def artifact_dataset(data, bucket):
+    dataset_name = data.get('dataset_name')
+    if dataset_name:
+        return artifacts.copy_stored_dataset(bucket, get_dataset_blob(dataset_name))
+    csv_bytes = pd.DataFrame(data.get('dataset')).to_csv(index = False).encode()
+    return artifacts.store_dataset_copy(bucket, csv_bytes)
+
+def points_reference(trained, data, bucket, dataset_reference):
+    # k-means points are the training rows, so they can usually be read back from a dataset copy
+    if trained['points'] is None:
+        source_blob = training.pinned_blob(trained['source'], trained.get('source_generation'))
+        return artifacts.copy_stored_dataset(bucket, source_blob)
+    try:
+        points = training.load_source(dataset_source(data))[trained['features']].to_numpy(dtype = np.float64)
+    except (KeyError, ValueError):
+        return None
+    if points.shape == trained['points'].shape and np.array_equal(points, trained['points'], equal_nan = True):
+        return dataset_reference
+    return None
 
 @app.route('/save_model', methods = ['POST'])
 def save_model():
@@ -130,42 +529,40 @@ def save_model():
     model_name = data.get('model_name')
     features = data.get('features')
     target = data.get('target')
-    dataset = data.get('dataset')
-    if not algo_name or not model_name or not features or not target or not dataset:
+    if not algo_name or not model_name or not features or not target or not has_dataset(data):
         return jsonify({'error': 'Must provide all required information'}), 400
     
-    current_model = trained_models[algo_name]
-    model_buffer = io.BytesIO()
-    dump(current_model, model_buffer)
-    model_buffer.seek(0)
-
-    df_dataset= pd.DataFrame(dataset)
-    dataset_buffer = io.StringIO()
-    df_dataset.to_csv(dataset_buffer, index = False)
-    dataset_buffer.seek(0)
+    current_model = get_model(algo_name)
+    if current_model is None:
+        return jsonify({'error': 'Model not trained'}), 400
 
-    metadata = {
-        "features": features,
-        "target": target,
-        "algo_name": algo_name
-    }
-    metadata_buffer = io.StringIO()
-    json.dump(metadata, metadata_buffer)
-    metadata_buffer.seek(0)
+    return run_save('save_model', upload_model, (data, current_model), data)
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr(f"{model_name}.joblib", model_buffer.getvalue())
-        zf.writestr(f"{model_name}_data.csv", dataset_buffer.getvalue())
-        zf.writestr(f"{model_name}_metadata.json", metadata_buffer.getvalue())
-    zip_buffer.seek(0)
+def run_save(label, upload, args, data):
+    if data.get('async'):
+        # uploads only wait on storage, so a driver thread holds them instead of a request thread
+        job_id = job_manager.submit_driver(label, upload, args)
+        return jsonify({'job_id': job_id}), 202
+    try:
+        return jsonify(upload(*args)), 200
+    except training.DatasetChangedError as e:
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(gcp_models_bucket)
-    blob = bucket.blob(f"{model_name}.zip")
-    blob.upload_from_file(zip_buffer)
+def upload_model(data, current_model, context = None):
+    bucket = object_store.bucket(gcp_models_bucket)
 
-    return jsonify({'success': 'model, data, and metadata successfully saved and uploaded'}), 200
+    manifest = {
+        'features': data['features'],
+        'target': data['target'],
+        'algo_name': data['algo_name'],
+        'dataset': artifact_dataset(data, bucket)
+    }
+    blob = bucket.blob(f"{data['model_name']}.zip")
+    blob.upload_from_file(artifacts.write_artifact(manifest, current_model))
+    model_listing.add(blob.name)
+    return {'success': 'model, data, and metadata successfully saved and uploaded'}
 
 @app.route('/save_unsupervised', methods = ['POST'])
 def save_unsupervised():
@@ -176,48 +573,36 @@ def save_unsupervised():
     algo_name = data.get('algo_name')
     model_name = data.get('model_name')
     features = data.get('features')
-    dataset = data.get('dataset')
-    if not algo_name or not model_name or not features or not dataset:
+    if not algo_name or not model_name or not features or not has_dataset(data):
         return jsonify({'error': 'Must provide all required information'}), 400
     
-    current_model = trained_models[algo_name]['model']
-    model_buffer = io.BytesIO()
-    dump(current_model, model_buffer)
-    model_buffer.seek(0)
-    
-    new_dataset = trained_models[algo_name]['new_dataset']
-    df_new_dataset = pd.DataFrame(new_dataset)
-    new_dataset_buffer = io.StringIO()
-    df_new_dataset.to_csv(new_dataset_buffer, index = False)
-    new_dataset_buffer.seek(0)
-
-    df_dataset= pd.DataFrame(dataset)
-    dataset_buffer = io.StringIO()
-    df_dataset.to_csv(dataset_buffer, index = False)
-    dataset_buffer.seek(0)
-
-    metadata = {
-        "features": features,
-        "algo_name": algo_name
-    }
-    metadata_buffer = io.StringIO()
-    json.dump(metadata, metadata_buffer)
-    metadata_buffer.seek(0)
+    trained = get_model(algo_name)
+    if trained is None:
+        return jsonify({'error': 'Model not trained'}), 400
 
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
-        zf.writestr(f"{model_name}.joblib", model_buffer.getvalue())
-        zf.writestr(f"{model_name}_data.csv", dataset_buffer.getvalue())
-        zf.writestr(f"{model_name}_new_data.csv", new_dataset_buffer.getvalue())
-        zf.writestr(f"{model_name}_metadata.json", metadata_buffer.getvalue())
-    zip_buffer.seek(0)
+    return run_save('save_unsupervised', upload_unsupervised, (data, trained), data)
 
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(gcp_models_bucket)
-    blob = bucket.blob(f"{model_name}.zip")
-    blob.upload_from_file(zip_buffer)
+def upload_unsupervised(data, trained, context = None):
+    bucket = object_store.bucket(gcp_models_bucket)
 
-    return jsonify({'success': 'model, data, and metadata successfully saved and uploaded'}), 200
+    dataset_reference = artifact_dataset(data, bucket)
+    manifest = {
+        'features': data['features'],
+        'algo_name': data['algo_name'],
+        'dataset': dataset_reference,
+        'statistics': trained['statistics']
+    }
+    arrays = {artifacts.labels_member: trained['labels']}
+    points_dataset = points_reference(trained, data, bucket, dataset_reference)
+    if points_dataset is not None:
+        manifest['points_dataset'] = points_dataset
+    else:
+        arrays[artifacts.points_member] = trained['points']
+
+    blob = bucket.blob(f"{data['model_name']}.zip")
+    blob.upload_from_file(artifacts.write_artifact(manifest, trained['model'], arrays))
+    model_listing.add(blob.name)
+    return {'success': 'model, data, and metadata successfully saved and uploaded'}
 
 @app.route('/delete_model', methods = ['POST'])
 def delete_model():
@@ -228,12 +613,12 @@ def delete_model():
         return jsonify({'error': 'No model name provided'}), 400
     
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(gcp_models_bucket)
+        bucket = object_store.bucket(gcp_models_bucket)
 
         blob = bucket.blob(model_name)
         if blob.exists():
             blob.delete()
+            model_listing.remove(model_name)
             return jsonify({'error': 'Model deleted successfully'}), 200
         else:
             return jsonify({'error': 'Model not found'}), 404
@@ -243,74 +628,121 @@ def delete_model():
 @app.route('/fetch_model_names', methods = ['GET'])
 def fetch_model_names():
     try:
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(gcp_models_bucket)
-        blobs = bucket.list_blobs()
-
-        model_names = [blob.name for blob in blobs]
-        return jsonify(model_names), 200
+        return listing_response(model_listing)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def parse_legacy_artifact(zf, parsed_model_name):
+    with zf.open(f"{parsed_model_name}.joblib") as model_file:
+        model_buffer = io.BytesIO(model_file.read())
+        current_model = load(model_buffer)
+
+    with zf.open(f"{parsed_model_name}_metadata.json") as metadata_file:
+        metadata_buffer = io.StringIO(metadata_file.read().decode())
+        metadata = json.load(metadata_buffer)
+
+    entry = current_model
+    if metadata['algo_name'] == 'k_means':
+        with zf.open(f"{parsed_model_name}_new_data.csv") as new_dataset_file:
+            new_dataset_buffer = io.StringIO(new_dataset_file.read().decode())
+            df_new_dataset = pd.read_csv(new_dataset_buffer)
+
+        features = metadata['features']
+        entry = training.k_means_entry(
+            current_model,
+            features,
+            df_new_dataset[features].to_numpy(),
+            df_new_dataset['cluster'].to_numpy()
+        )
+
+    return {'metadata': metadata, 'entry': entry, 'dataset': ('member', f"{parsed_model_name}_data.csv")}
+
+def parse_artifact(zf, model_name):
+    if not artifacts.is_versioned(zf):
+        return parse_legacy_artifact(zf, model_name.split('.zip')[0])
+
+    manifest = artifacts.read_manifest(zf)
+    entry = artifacts.read_model(zf, manifest)
+    if manifest['algo_name'] == 'k_means':
+        points_dataset = manifest.get('points_dataset')
+        entry = {
+            'model': entry,
+            'features': manifest['features'],
+            'points': None if points_dataset else artifacts.read_array(zf, artifacts.points_member),
+            'labels': artifacts.read_array(zf, artifacts.labels_member),
+            'statistics': manifest['statistics']
+        }
+        if points_dataset:
+            entry['source'] = ('blob', gcp_models_bucket, points_dataset)
+
+    metadata = {name: manifest[name] for name in ('features', 'target', 'algo_name') if name in manifest}
+    return {
+        'metadata': metadata,
+        'entry': entry,
+        'dataset': ('blob', gcp_models_bucket, manifest['dataset']),
+        'artifact_version': manifest['version']
+    }
+
+artifact_cache = artifacts.ArtifactCache(
+    os.path.join(cache_dir, 'artifacts'),
+    int(os.getenv('LEARNING_RATE_ARTIFACT_DISK_BYTES', str(5 * 1024 ** 3))),
+    int(os.getenv('LEARNING_RATE_ARTIFACT_MEMORY_BYTES', str(512 * 1024 ** 2))),
+    parse_artifact
+)
+
+def artifact_dataset_frame(blob, loaded):
+    kind, *location = loaded['dataset']
+    if kind == 'blob':
+        return dataset_cache.frame(training.get_blob(*location))
+    with artifacts.open_artifact(blob) as zf:
+        with zf.open(location[0]) as dataset_file:
+            return pd.read_csv(dataset_file)
+
+def preload_artifacts():
+    model_names = [name.strip() for name in os.getenv('LEARNING_RATE_PRELOAD_MODELS', '').split(',') if name.strip()]
+    if not model_names:
+        return
+
+    bucket = object_store.bucket(gcp_models_bucket)
+    for model_name in model_names:
+        try:
+            blob = bucket.get_blob(model_name)
+            if blob is None:
+                app.logger.warning("preload skipped missing model '%s'", model_name)
+                continue
+            artifact_cache.load(blob)
+        except Exception as e:
+            app.logger.warning("preload of model '%s' failed: %s", model_name, e)
+
 @app.route('/load_model', methods = ['POST'])
 def load_model():
     data = request.json
     if not data:
         return jsonify({'error': 'Must provide file info'}), 400
     
-    model_name = data['model_name']
-    if not data:
+    model_name = data.get('model_name')
+    if not model_name:
         return jsonify({'error': 'Must provide model name'}), 400
+    include_dataset = data.get('include_dataset', True)
     
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(gcp_models_bucket)
-    blob = bucket.blob(model_name)
-
-    zip_buffer = io.BytesIO()
-    blob.download_to_file(zip_buffer)
-    zip_buffer.seek(0)
-
-    parsed_model_name = model_name.split('.zip')[0]
-    with zipfile.ZipFile(zip_buffer, 'r') as zf:
-
-        with zf.open(f"{parsed_model_name}.joblib") as model_file:
-            model_buffer = io.BytesIO(model_file.read())
-            current_model = load(model_buffer)
-
-        with zf.open(f"{parsed_model_name}_data.csv") as dataset_file:
-            dataset_buffer = io.StringIO(dataset_file.read().decode())
-            df_dataset = pd.read_csv(dataset_buffer)
-
-        with zf.open(f"{parsed_model_name}_metadata.json") as metadata_file:
-            metadata_buffer = io.StringIO(metadata_file.read().decode())
-            metadata = json.load(metadata_buffer)
-        
-        if metadata['algo_name'] == 'k_means':
-            with zf.open(f"{parsed_model_name}_new_data.csv") as new_dataset_file:
-                new_dataset_buffer = io.StringIO(new_dataset_file.read().decode())
-                df_new_dataset = pd.read_csv(new_dataset_buffer)
-        
-    algo_name = metadata['algo_name']
-    if algo_name == 'k_means':
-        if algo_name in trained_models:
-            trained_models[algo_name]['model'] = current_model
-            trained_models[algo_name]['new_dataset'] = df_new_dataset.to_dict(orient = 'records')
-        else:
-            trained_models[algo_name] = {
-                'model': current_model,
-                'new_dataset': df_new_dataset.to_dict(orient='records')
-            }
-    else:
-        if algo_name not in trained_models:
-            trained_models[algo_name] = {}
-        trained_models[algo_name] = current_model
+    bucket = object_store.bucket(gcp_models_bucket)
+    blob = bucket.get_blob(model_name)
+    if blob is None:
+        return jsonify({'error': 'Model not found'}), 404
 
-    result = {
-        'metadata': metadata,
-        'dataset': df_dataset.to_dict(orient = 'records')
-    }
+    try:
+        loaded = artifact_cache.load(blob)
+        model_registry.put(session_id(), loaded['metadata']['algo_name'], loaded['entry'])
+
+        result = {'metadata': loaded['metadata']}
+        if 'artifact_version' in loaded:
+            result['artifact_version'] = loaded['artifact_version']
+        if include_dataset:
+            result['dataset'] = artifact_dataset_frame(blob, loaded)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
-    return jsonify(result), 200
+    return serialization.respond(result)
 
 
 @app.route('/train_lin_reg', methods = ['POST'])
@@ -321,26 +753,20 @@ def train_lin_reg():
     
     features = data.get('features')
     target = data.get('target')
-    dataset = data.get('dataset')
-    if not features or not target or not dataset:
-        return jsonify({'error': 'features, target, and dataset must be provided'})
+    if not features or not target or not has_dataset(data):
+        return jsonify({'error': 'features, target, and dataset or dataset_name must be provided'})
     
     try:
-        df = pd.DataFrame(dataset)
-        x = df[features]
-        y = df[target]
-
-        model = LinearRegression()
-        model.fit(x, y)
-        trained_models['lin_reg'] = model
-
-        coefficients = model.coef_.tolist()
-
-        result = {
-            'coefficients': {features[i]: coefficients[i] for i in range(len(features))}
+        params = {
+            'features': features,
+            'target': target,
+            'mode': data.get('mode', 'full'),
+            'batch_size': data.get('batch_size'),
+            'max_passes': data.get('max_passes')
         }
-        
-        return jsonify(result), 200
+        if params['mode'] == 'streaming' and not data.get('dataset_name'):
+            return jsonify({'error': 'streaming mode requires dataset_name'}), 400
+        return train('lin_reg', data, params)
     except Exception as e:
         return jsonify({'error': str(e)})
     
@@ -354,18 +780,15 @@ def load_lin_reg():
     if not features:
         return jsonify({'error': 'features must be provided'})
     try:
-        model = trained_models['lin_reg']
-        coefficients = model.coef_.tolist()
-        result = {
-            'coefficients': {features[i]: coefficients[i] for i in range(len(features))}
-        }
-        return jsonify(result), 200
+        model = require_model('lin_reg')
+        return jsonify(training.lin_reg_summary(model, features)), 200
     except Exception as e:
         return jsonify({'error': str(e)})
     
 @app.route('/infer_lin_reg', methods = ['POST'])
 def infer_lin_reg():
-    if 'lin_reg' not in trained_models:
+    entry = get_entry('lin_reg')
+    if entry is None:
         return jsonify({'error': 'Model not trained'}), 400
     
     data = request.json
@@ -374,10 +797,11 @@ def infer_lin_reg():
         return jsonify({'error': 'Features not provided'}), 400
     
     try:
-        model = trained_models['lin_reg']
-        df = pd.DataFrame([features], index = [0])
-        prediction = model.predict(df)
-        return jsonify({'prediction': prediction.tolist()}), 200
+        prediction = entry.predict_one(features)
+        if prediction is None:
+            df = pd.DataFrame([features], index = [0])
+            prediction = entry.model.predict(df).tolist()
+        return jsonify({'prediction': prediction}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -389,41 +813,20 @@ def train_log_reg():
 
     features = data.get('features')
     target = data.get('target')
-    dataset = data.get('dataset')
-    if not features or not target or not dataset:
-        return jsonify({'error': 'features, target, and dataset must be provided'})
-
-    try:
-        df = pd.DataFrame(dataset)
-        x = df[features]
-        y = df[target]
-
-        unique_classes = y.nunique()
-        if unique_classes == 2:
-            model = LogisticRegression(multi_class = 'auto', solver = 'liblinear')
-        elif unique_classes > 2:
-            model = LogisticRegression(multi_class = 'multinomial', solver = 'lbfgs')
-        model.fit(x, y)
-        trained_models['log_reg'] = model
-
-        coefficients = model.coef_
-        if coefficients.ndim == 1:
-            coefficients = coefficients.reshape(1, -1)
-        
-        intercepts = model.intercept_
-        if intercepts.ndim == 0:
-            intercepts = np.array([intercepts])
-
-        coefficients_map = {class_label: dict(zip(features, coeff)) for class_label, coeff in zip(model.classes_, coefficients)}
-        intercepts_map = {class_label: intercept for class_label, intercept in zip(model.classes_, intercepts)}
-
-        result = {
-            'intercepts': intercepts_map,
-            'coefficients': coefficients_map,
-            'classes': model.classes_.tolist()
-        }
+    if not features or not target or not has_dataset(data):
+        return jsonify({'error': 'features, target, and dataset or dataset_name must be provided'})
 
-        return jsonify(result), 200
+    try:
+        params = {
+            'features': features,
+            'target': target,
+            'mode': data.get('mode', 'full'),
+            'batch_size': data.get('batch_size'),
+            'max_passes': data.get('max_passes')
+        }
+        if params['mode'] == 'streaming' and not data.get('dataset_name'):
+            return jsonify({'error': 'streaming mode requires dataset_name'}), 400
+        return train('log_reg', data, params)
     except Exception as e:
         return jsonify({'error': str(e)})
     
@@ -438,32 +841,15 @@ def load_log_reg():
         return jsonify({'error': 'features must be provided'}), 400
 
     try:
-        model = trained_models['log_reg']
-
-        coefficients = model.coef_
-        if coefficients.ndim == 1:
-            coefficients = coefficients.reshape(1, -1)
-
-        intercepts = model.intercept_
-        if intercepts.ndim == 0:
-            intercepts = np.array([intercepts])
-
-        coefficients_map = {class_label: dict(zip(features, coeff)) for class_label, coeff in zip(model.classes_, coefficients)}
-        intercepts_map = {class_label: intercept for class_label, intercept in zip(model.classes_, intercepts)}
-
-        result = {
-            'intercepts': intercepts_map,
-            'coefficients': coefficients_map,
-            'classes': model.classes_.tolist()
-        }
-
-        return jsonify(result), 200
+        model = require_model('log_reg')
+        return jsonify(training.log_reg_summary(model, features)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/infer_log_reg', methods = ['POST'])
 def infer_log_reg():
-    if 'log_reg' not in trained_models:
+    entry = get_entry('log_reg')
+    if entry is None:
         return jsonify({'error': 'Model not trained'}), 400
     
     data = request.json
@@ -472,10 +858,11 @@ def infer_log_reg():
         return jsonify({'error': 'Features not provided'}), 400
     
     try:
-        model = trained_models['log_reg']
-        df = pd.DataFrame([features])
-        prediction = model.predict(df)
-        return jsonify({'prediction': prediction.tolist()}), 200
+        prediction = entry.predict_one(features)
+        if prediction is None:
+            df = pd.DataFrame([features])
+            prediction = entry.model.predict(df).tolist()
+        return jsonify({'prediction': prediction}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -487,29 +874,39 @@ def train_random_forest():
     
     features = data.get('features')
     target = data.get('target')
-    dataset = data.get('dataset')
     n_trees = int(data.get('n_trees', 100))
-    if not features or not target or not dataset:
-        return jsonify({'error': 'features, target, and dataset must be provided'})
-
-    try:
-        df = pd.DataFrame(dataset)
-        x = df[features]
-        y = df[target]
-        model = RandomForestClassifier(n_estimators = n_trees, oob_score = True)
-        model.fit(x, y)
-        trained_models['random_forest'] = model
-
-        feature_importance = dict(zip(features, model.feature_importances_.tolist()))
-        estimators = len(model.estimators_)
-        classes = list(model.classes_)
-        result = {
-            'feature_importance': feature_importance,
-            "estimators": estimators,
-            'classes': classes
-        }
+    if not features or not target or not has_dataset(data):
+        return jsonify({'error': 'features, target, and dataset or dataset_name must be provided'})
+
+    n_jobs = data.get('n_jobs')
+    if n_jobs == -1:
+        n_jobs = None
+    if n_jobs is not None and (not isinstance(n_jobs, int) or n_jobs < 1):
+        return jsonify({'error': 'n_jobs must be a positive integer or -1'}), 400
+
+    params = {
+        'features': features,
+        'target': target,
+        'n_trees': n_trees,
+        'n_jobs': n_jobs,
+        'oob_score': bool(data.get('oob_score', False)),
+        'max_samples': data.get('max_samples')
+    }
 
-        return jsonify(result), 200
+    if data.get('warm_start'):
+        base_model = get_model('random_forest')
+        if base_model is None:
+            return jsonify({'error': 'random forest model must be trained before warm starting'}), 400
+        if list(base_model.feature_names_in_) != list(features):
+            return jsonify({'error': 'warm start requires the same features as the trained forest'}), 400
+        if n_trees < len(base_model.estimators_):
+            return jsonify({'error': f"n_trees must be at least the {len(base_model.estimators_)} trees already trained"}), 400
+        params['warm_start_model'] = base_model
+
+    try:
+        if 'warm_start_model' in params and not training.same_classes(base_model, training.target_classes(dataset_source(data), target)):
+            return jsonify({'error': 'warm start requires the same target classes as the trained forest'}), 400
+        return train('random_forest', data, params)
     except Exception as e:
         return jsonify({'error': str(e)})
 
@@ -524,18 +921,8 @@ def load_random_forest():
         return jsonify({'error': 'features must be provided'}), 400
 
     try:
-        model = trained_models['random_forest']
-
-        feature_importance = dict(zip(features, model.feature_importances_.tolist()))
-        estimators = len(model.estimators_)
-        classes = list(model.classes_)
-        result = {
-            'feature_importance': feature_importance,
-            'estimators': estimators,
-            'classes': classes
-        }
-
-        return jsonify(result), 200
+        model = require_model('random_forest')
+        return jsonify(training.random_forest_summary(model, features)), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -544,39 +931,26 @@ def graph_random_forest():
     data = request.json
     tree_index = data.get('tree_index')
 
-    if 'random_forest' not in trained_models:
+    entry = get_entry('random_forest')
+    if entry is None:
         return jsonify({'error': 'Random Forest model not trained'}), 400
     
     if tree_index is None or not isinstance(tree_index, int):
         return jsonify({'error': 'Tree index must be provided'}), 400
     
-    try:
-        forest = trained_models['random_forest']
-        tree = forest.estimators_[tree_index - 1]
-        dot_data = export_graphviz(tree, out_file = None, filled = True, rounded = True)
-        graph = pydotplus.graph_from_dot_data(dot_data)
-        png_image = graph.create_png()
-
-        # Convert byte data to an image
-        image = Image.open(io.BytesIO(png_image))
-        # Resize the image to a more manageable size
-        image = image.resize((1024, 768), Image.Resampling.LANCZOS)
-
-        # Save the resized image back to a byte buffer
-        buffer = io.BytesIO()
-        image.save(buffer, format = 'PNG')
-        resized_png_image = buffer.getvalue()
-
-        # Encode to base64
-        image_base64 = base64.b64encode(resized_png_image).decode('utf-8')
-        return jsonify({'image_base64': image_base64}), 200
-    except Exception as e:
-        print("Error generating image: ", str(e)) 
-        return jsonify({'error': str(e)}), 500
+    return graph_response('random_forest', entry, entry.model.estimators_, data, (1024, 768))
     
+@app.route('/tree_random_forest', methods = ['POST'])
+def tree_random_forest():
+    entry = get_entry('random_forest')
+    if entry is None:
+        return jsonify({'error': 'Random Forest model not trained'}), 400
+    return tree_response(entry, entry.model.estimators_, request.json or {})
+
 @app.route('/infer_random_forest', methods = ['POST'])
 def infer_random_forest():
-    if 'random_forest' not in trained_models:
+    entry = get_entry('random_forest')
+    if entry is None:
         return jsonify({'error': 'Random Forest model not trained'}), 400
     
     data = request.json
@@ -585,10 +959,11 @@ def infer_random_forest():
         return jsonify({'error': 'Features not provided'}), 400
     
     try:
-        model = trained_models['random_forest']
-        df = pd.DataFrame([features])
-        prediction = model.predict(df)
-        return jsonify({'prediction': prediction.tolist()}), 200
+        prediction = entry.predict_one(features)
+        if prediction is None:
+            df = pd.DataFrame([features])
+            prediction = entry.model.predict(df).tolist()
+        return jsonify({'prediction': prediction}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -600,35 +975,30 @@ def train_grad_boost_reg():
     
     features = data.get('features')
     target = data.get('target')
-    dataset = data.get('dataset')
     n_trees = data.get('n_trees')
     learning_rate = data.get('learning_rate')
     max_depth = data.get('max_depth')
-    if not features or not target or not dataset or not n_trees or not learning_rate or not max_depth:
+    if not features or not target or not has_dataset(data) or not n_trees or not learning_rate or not max_depth:
         return jsonify({'error': 'please provide all required fields'})
+
+    engine = data.get('engine', 'exact')
+    if engine not in ('exact', 'hist'):
+        return jsonify({'error': "engine must be 'exact' or 'hist'"}), 400
     
     try:
-        df = pd.DataFrame(dataset)
-        x = df[features]
-        y = df[target]
-        model = GradientBoostingRegressor(n_estimators = n_trees, learning_rate = learning_rate, max_depth = max_depth)
-        model.fit(x, y)
-        trained_models['grad_boost_reg'] = model
-
-        feature_importance = dict(zip(features, model.feature_importances_.tolist()))
-        estimators = len(model.estimators_)
-        train_scores = model.train_score_.tolist()
-        final_learning_rate = model.learning_rate
-        final_max_depth = model.max_depth
-        result = {
-            'feature_importance': feature_importance,
-            'estimators': estimators,
-            'train_scores': train_scores,
-            'learning_rate': final_learning_rate,
-            'max_depth': final_max_depth
+        params = {
+            'features': features,
+            'target': target,
+            'n_trees': n_trees,
+            'learning_rate': learning_rate,
+            'max_depth': max_depth,
+            'engine': engine
         }
-
-        return jsonify(result), 200
+        if engine == 'hist':
+            for field in ('validation_fraction', 'n_iter_no_change'):
+                if data.get(field) is not None:
+                    params[field] = data[field]
+        return train('grad_boost_reg', data, params)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -643,21 +1013,8 @@ def load_grad_boost_reg():
         return jsonify({'error': 'features must be provided'}), 400
     
     try:
-        model = trained_models['grad_boost_reg']
-
-        feature_importance = dict(zip(features, model.feature_importances_.tolist()))
-        estimators = len(model.estimators_)
-        train_scores = model.train_score_.tolist()
-        final_learning_rate = model.learning_rate
-        final_max_depth = model.max_depth
-        result = {
-            'feature_importance': feature_importance,
-            'estimators': estimators,
-            'train_scores': train_scores,
-            'learning_rate': final_learning_rate,
-            'max_depth': final_max_depth
-        }
-        return jsonify(result), 200
+        model = require_model('grad_boost_reg')
+        return serialization.respond(training.grad_boost_reg_summary(model, features))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -666,35 +1023,26 @@ def graph_grad_boost_reg():
     data = request.json
     tree_index = data.get('tree_index')
 
-    if 'grad_boost_reg' not in trained_models:
+    entry = get_entry('grad_boost_reg')
+    if entry is None:
         return jsonify({'error': 'grad boost regressor model must be trained'}), 400
     
     if tree_index is None or not isinstance(tree_index, int):
         return jsonify({'error': 'Tree index must be provided'}), 400
     
-    try:
-        model = trained_models['grad_boost_reg']
-        tree = model.estimators_[tree_index - 1, 0]
-        dot_data = export_graphviz(tree, out_file = None, filled = True, rounded = True)
-        graph = pydotplus.graph_from_dot_data(dot_data)
-        png_image = graph.create_png()
-
-        image = Image.open(io.BytesIO(png_image))
-        image = image.resize((1023, 768), Image.Resampling.LANCZOS)
-
-        buffer = io.BytesIO()
-        image.save(buffer, format = 'PNG')
-        resized_png_image = buffer.getvalue()
+    return graph_response('grad_boost_reg', entry, boosting_trees(entry.model), data, (1023, 768))
 
-        image_base64 = base64.b64encode(resized_png_image).decode('utf-8')
-        return jsonify({'image_base64': image_base64}), 200
-    except Exception as e:
-        print("Error generating image: ", str(e)) 
-        return jsonify({'error': str(e)}), 500
+@app.route('/tree_grad_boost_reg', methods = ['POST'])
+def tree_grad_boost_reg():
+    entry = get_entry('grad_boost_reg')
+    if entry is None:
+        return jsonify({'error': 'grad boost regressor model must be trained'}), 400
+    return tree_response(entry, boosting_trees(entry.model), request.json or {})
 
 @app.route('/infer_grad_boost_reg', methods = ['POST'])
 def infer_grad_boost_reg():
-    if 'grad_boost_reg' not in trained_models:
+    entry = get_entry('grad_boost_reg')
+    if entry is None:
         return jsonify({'error': 'grad boost reg model not trained'}), 400
     
     data = request.json
@@ -703,10 +1051,11 @@ def infer_grad_boost_reg():
         return jsonify({'error': 'Features not provided'}), 400
     
     try:
-        model = trained_models['grad_boost_reg']
-        df = pd.DataFrame([features])
-        prediction = model.predict(df)
-        return jsonify({'prediction': prediction.tolist()}), 200
+        prediction = entry.predict_one(features)
+        if prediction is None:
+            df = pd.DataFrame([features])
+            prediction = entry.model.predict(df).tolist()
+        return jsonify({'prediction': prediction}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
@@ -717,45 +1066,26 @@ def train_k_means():
         return jsonify({'error': 'Data must be provided'}), 400
     
     features = data.get('features')
-    dataset = data.get('dataset')
     n_clusters = data.get('n_clusters')
-    if not features or not dataset or not n_clusters or n_clusters > 8:
+    mode = data.get('mode', 'full')
+    if mode not in ('full', 'streaming'):
+        return jsonify({'error': "mode must be 'full' or 'streaming'"}), 400
+    if mode == 'streaming':
+        if not features or not data.get('dataset_name') or not n_clusters or n_clusters > max_streaming_clusters:
+            return jsonify({'error': f'Please provide features and dataset_name, and ensure n_clusters is at most {max_streaming_clusters}'}), 400
+    elif not features or not has_dataset(data) or not n_clusters or n_clusters > 8:
         return jsonify({'error': 'Please provide all information, and ensure n_clusters is at most 8'}), 400
     
     try:
-        df = pd.DataFrame(dataset)
-        x = df[features]
-        model = KMeans(n_clusters = n_clusters)
-        df['cluster'] = model.fit_predict(x)
-        new_df = df[features + ['cluster']]
-        new_dataset = new_df.to_dict(orient = 'records')
-        trained_models['k_means'] = {
-            'model': model,
-            'new_dataset': new_dataset
-        }
-
-        centers = {str(i): {str(feature): float(center[j]) for j, feature in enumerate(features)} for i, center in enumerate(model.cluster_centers_)}
-
-        class_labels = [class_label for class_label in range(model.n_clusters)]
-
-        cluster_inertias = {}
-        for cluster_index in range(model.n_clusters):
-            points_in_cluster = new_df[new_df['cluster'] == cluster_index][features]
-            center = model.cluster_centers_[cluster_index]
-            intertia = np.sum((points_in_cluster - center) ** 2).sum()
-            cluster_inertias[str(cluster_index)] = intertia
-
-        cluster_sizes = {str(key): int(value) for key, value in zip(*np.unique(model.labels_, return_counts = True))}
-
-        result = {
-            'centers': centers,
-            'new_dataset': new_dataset,
-            'class_labels': class_labels,
-            "cluster_inertias": cluster_inertias,
-            'cluster_sizes': cluster_sizes
+        params = {
+            'features': features,
+            'n_clusters': n_clusters,
+            'labels_only': data.get('labels_only', False),
+            'mode': mode,
+            'batch_size': data.get('batch_size'),
+            'max_passes': data.get('max_passes')
         }
-        
-        return jsonify(result), 200
+        return train('k_means', data, params)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -770,38 +1100,20 @@ def load_k_means():
         return jsonify({'error': 'Provide all information'}), 400
     
     try:
-        model = trained_models['k_means']['model']
-        new_dataset = trained_models['k_means']['new_dataset']
-        new_df = pd.DataFrame(new_dataset)
-
-        centers = {str(i): {str(feature): float(center[j]) for j, feature in enumerate(features)} for i, center in enumerate(model.cluster_centers_)}
-
-        class_labels = [class_label for class_label in range(model.n_clusters)]
-
-        cluster_inertias = {}
-        for cluster_index in range(model.n_clusters):
-            points_in_cluster = new_df[new_df['cluster'] == cluster_index][features]
-            center = model.cluster_centers_[cluster_index]
-            intertia = np.sum((points_in_cluster - center) ** 2).sum()
-            cluster_inertias[str(cluster_index)] = intertia
-
-        cluster_sizes = {str(key): int(value) for key, value in zip(*np.unique(model.labels_, return_counts = True))}
-
-        result = {
-            'centers': centers,
-            'new_dataset': new_dataset,
-            'class_labels': class_labels,
-            'cluster_inertias': cluster_inertias,
-            'cluster_sizes': cluster_sizes
-        }
-
-        return jsonify(result), 200
+        trained = require_model('k_means')
+        model = trained['model']
+        result = training.k_means_summary(model, features, trained['statistics'])
+        result.update(training.labelled_result(trained, data.get('labels_only', False)))
+        return serialization.respond(result)
+    except training.DatasetChangedError as e:
+        return jsonify({'error': str(e)}), 409
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
 @app.route('/infer_k_means', methods = ['POST'])
 def infer_k_means():
-    if 'k_means' not in trained_models:
+    entry = get_entry('k_means')
+    if entry is None:
         return jsonify({'error': 'Model not trained'}), 200
     
     data = request.json
@@ -810,13 +1122,198 @@ def infer_k_means():
         return jsonify({'error': 'Features not provided'}), 200
     
     try:
-        model = trained_models['k_means']['model']
-        df = pd.DataFrame([features])
-        prediction = model.predict(df)
-        return jsonify({'prediction': prediction.tolist()}), 200
+        prediction = entry.predict_one(features)
+        if prediction is None:
+            df = pd.DataFrame([features])
+            prediction = entry.model['model'].predict(df).tolist()
+        return jsonify({'prediction': prediction}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def batch_frame(model, data):
+    feature_names = list(getattr(model, 'feature_names_in_', data.get('features') or []))
+    dataset_name = data.get('dataset_name')
+    rows = data.get('rows')
+    if dataset_name:
+        return load_dataset(dataset_name, feature_names)
+    if not rows:
+        raise ValueError('rows or dataset_name must be provided')
+    if isinstance(rows[0], dict):
+        df = pd.DataFrame(rows)
+    else:
+        df = pd.DataFrame(rows, columns = data.get('features') or feature_names)
+    return df[feature_names] if feature_names else df
+
+def batch_infer(algo_name, with_proba = False):
+    data = request.json
+    if not data:
+        return jsonify({'error': 'rows or dataset_name must be provided'}), 400
+
+    trained = get_model(algo_name)
+    if trained is None:
+        return jsonify({'error': 'Model not trained'}), 400
+    model = trained['model'] if algo_name == 'k_means' else trained
+    proba = with_proba and bool(data.get('proba'))
+
+    try:
+        df = batch_frame(model, data)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+
+    def score(chunk):
+        result = {'predictions': model.predict(chunk)}
+        if proba:
+            result['probabilities'] = model.predict_proba(chunk)
+        return result
+
+    chunk_rows = data.get('chunk_size', batch_stream_rows)
+    if isinstance(chunk_rows, bool) or not isinstance(chunk_rows, int) or chunk_rows < 1:
+        return jsonify({'error': 'chunk_size must be a positive integer'}), 400
+
+    try:
+        if not data.get('stream') and len(df) <= chunk_rows:
+            result = score(df)
+            if proba:
+                result['classes'] = model.classes_.tolist()
+            return serialization.respond(result)
+
+        def generate():
+            if proba:
+                yield serialization.dumps({'classes': model.classes_}) + b'\n'
+            for offset in range(0, len(df), chunk_rows):
+                chunk = score(df.iloc[offset:offset + chunk_rows])
+                chunk['offset'] = offset
+                yield serialization.dumps(chunk) + b'\n'
+
+        return Response(generate(), mimetype = 'application/x-ndjson')
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/infer_lin_reg_batch', methods = ['POST'])
+def infer_lin_reg_batch():
+    return batch_infer('lin_reg')
+
+@app.route('/infer_log_reg_batch', methods = ['POST'])
+def infer_log_reg_batch():
+    return batch_infer('log_reg', with_proba = True)
+
+@app.route('/infer_random_forest_batch', methods = ['POST'])
+def infer_random_forest_batch():
+    return batch_infer('random_forest', with_proba = True)
+
+@app.route('/infer_grad_boost_reg_batch', methods = ['POST'])
+def infer_grad_boost_reg_batch():
+    return batch_infer('grad_boost_reg')
+
+@app.route('/infer_k_means_batch', methods = ['POST'])
+def infer_k_means_batch():
+    return batch_infer('k_means')
+
+@app.route('/search_random_forest', methods = ['POST'])
+def search_random_forest():
+    data = request.json
+    if not data or not data.get('features') or not data.get('target'):
+        return jsonify({'error': 'features, target, dataset_name and space must be provided'}), 400
+
+    params = {
+        'features': data['features'],
+        'target': data['target'],
+        'n_trees': int(data.get('n_trees', 100)),
+        'n_jobs': job_manager.worker_threads(),
+        'max_samples': data.get('max_samples')
+    }
+    return search('random_forest', data, params)
+
+@app.route('/search_grad_boost_reg', methods = ['POST'])
+def search_grad_boost_reg():
+    data = request.json
+    if not data or not data.get('features') or not data.get('target'):
+        return jsonify({'error': 'features, target, dataset_name and space must be provided'}), 400
+
+    engine = data.get('engine', 'exact')
+    if engine not in ('exact', 'hist'):
+        return jsonify({'error': "engine must be 'exact' or 'hist'"}), 400
+
+    params = {
+        'features': data['features'],
+        'target': data['target'],
+        'n_trees': data.get('n_trees', 100),
+        'learning_rate': data.get('learning_rate', 0.1),
+        'max_depth': data.get('max_depth', 3),
+        'engine': engine
+    }
+    return search('grad_boost_reg', data, params)
+
+@app.route('/search_k_means', methods = ['POST'])
+def search_k_means():
+    data = request.json
+    if not data or not data.get('features'):
+        return jsonify({'error': 'features, dataset_name and space must be provided'}), 400
+
+    params = {
+        'features': data['features'],
+        'n_clusters': data.get('n_clusters', 3),
+        'labels_only': data.get('labels_only', False)
+    }
+    return search('k_means', data, params)
+
+@app.route('/job_status', methods = ['GET'])
+def job_status():
+    job = job_manager.get(request.args.get('job_id'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_manager.describe(job)), 200
+
+@app.route('/job_stream', methods = ['GET'])
+def job_stream():
+    job = job_manager.get(request.args.get('job_id'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    interval = float(request.args.get('interval', 0.5))
+
+    def generate():
+        current = job
+        previous = None
+        while True:
+            description = job_manager.describe(current)
+            if description != previous:
+                yield json.dumps(description) + '\n'
+                previous = description
+            if current.finished_at is not None:
+                return
+            time.sleep(interval)
+            # another worker's job is a snapshot of its record, so read it again
+            current = job_manager.get(job.job_id) or current
+
+    return Response(generate(), mimetype = 'application/x-ndjson')
+
+@app.route('/job_result', methods = ['GET'])
+def job_result():
+    job = job_manager.get(request.args.get('job_id'))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    status = job.status
+    if status == 'succeeded':
+        return serialization.respond(job.result)
+    if status == 'failed':
+        return jsonify({'error': job.error}), 500
+    return jsonify(job_manager.describe(job)), 409 if status == 'cancelled' else 202
+
+@app.route('/cancel_job', methods = ['POST'])
+def cancel_job():
+    data = request.json
+    if not data or not data.get('job_id'):
+        return jsonify({'error': 'job_id must be provided'}), 400
+
+    job = job_manager.get(data['job_id'])
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job_id': job.job_id, 'status': job_manager.cancel(job)}), 200
+
+
+preload_artifacts()
 
 if __name__ == '__main__':
     app.run(debug = True)
\ No newline at end of file
@@ -0,0 +1,41 @@
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# the server reads its configuration at import, so point it at throwaway local storage first
+test_root = tempfile.mkdtemp(prefix = 'learning_rate_tests_')
+os.environ['LEARNING_RATE_STORAGE'] = 'local:' + os.path.join(test_root, 'storage')
+os.environ['LEARNING_RATE_CACHE_DIR'] = os.path.join(test_root, 'cache')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope = 'session')
+def server():
+    import server
+    return server
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
+
+@pytest.fixture
+def session_headers(request):
+    # a session per test keeps registered models from leaking between tests
+    return {'X-Session-Id': request.node.name}
+
+@pytest.fixture
+def regression_frame():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.random((500, 3)), columns = ['a', 'b', 'c'])
+    df['y'] = 3 * df['a'] - 2 * df['b'] + rng.normal(0, 0.01, 500)
+    return df
+
+def upload(client, name, df):
+    response = client.post('/store_data', data = {'file': (io.BytesIO(df.to_csv(index = False).encode()), name)})
+    assert response.status_code == 200, response.json
+    return response
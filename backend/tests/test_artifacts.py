@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+import artifacts
+import object_store
+
+
+class CountingReader:
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def read(self, size = -1):
+        data = self.raw.read(size)
+        self.bytes_read += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+
+@pytest.fixture
+def large_artifact(monkeypatch):
+    bucket = object_store.bucket('artifact_tests')
+    points = np.zeros((500_000, 2))
+    zip_buffer = artifacts.write_artifact({'algo_name': 'k_means'}, {'centers': [0, 1]}, {artifacts.points_member: points})
+    bucket.blob('large.zip').upload_from_file(zip_buffer)
+    blob = bucket.get_blob('large.zip')
+
+    readers = []
+    opened = blob.open
+
+    def counting_open(*args, **kwargs):
+        readers.append(CountingReader(opened(*args, **kwargs)))
+        return readers[-1]
+
+    monkeypatch.setattr(blob, 'open', counting_open)
+    monkeypatch.setattr(blob, 'download_to_filename', lambda filename: pytest.fail('downloaded the whole artifact'))
+    return blob, readers
+
+def parse_model(zf, name):
+    manifest = artifacts.read_manifest(zf)
+    return {'model': artifacts.read_model(zf, manifest), 'algo_name': manifest['algo_name']}
+
+def test_a_miss_reads_only_the_members_it_parses(tmp_path, large_artifact):
+    blob, readers = large_artifact
+    cache = artifacts.ArtifactCache(str(tmp_path / 'artifacts'), 10 ** 9, 10 ** 9, parse_model)
+    assert cache.load(blob) == {'model': {'centers': [0, 1]}, 'algo_name': 'k_means'}
+    assert readers[0].bytes_read < blob.size / 10
+
+def test_a_fresh_process_loads_the_parsed_copy_from_disk(tmp_path, large_artifact):
+    blob, readers = large_artifact
+    artifacts.ArtifactCache(str(tmp_path / 'artifacts'), 10 ** 9, 10 ** 9, parse_model).load(blob)
+    restarted = artifacts.ArtifactCache(str(tmp_path / 'artifacts'), 10 ** 9, 10 ** 9, parse_model)
+    assert restarted.load(blob)['model'] == {'centers': [0, 1]}
+    assert len(readers) == 1
@@ -0,0 +1,37 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def log_reg_session(client, session_headers):
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(rng.normal(size = (60, 2)), columns = ['a', 'b'])
+    df['label'] = np.where(df['a'] > 0, 'yes', 'no')
+    trained = client.post('/train_log_reg', json = {
+        'dataset': df.to_dict(orient = 'records'), 'features': ['a', 'b'], 'target': 'label'
+    }, headers = session_headers)
+    assert trained.status_code == 200 and 'error' not in trained.json, trained.json
+    return session_headers, df[['a', 'b']].to_dict(orient = 'records')
+
+def test_streamed_batch_is_bytes_ndjson_throughout(client, log_reg_session):
+    headers, rows = log_reg_session
+    response = client.post('/infer_log_reg_batch', json = {'rows': rows, 'proba': True, 'stream': True, 'chunk_size': 25}, headers = headers, buffered = False)
+    assert response.status_code == 200
+    pieces = list(response.response)
+    response.close()
+    assert all(isinstance(piece, bytes) for piece in pieces)
+
+    lines = [json.loads(line) for line in b''.join(pieces).splitlines()]
+    assert lines[0] == {'classes': ['no', 'yes']}
+    assert [line['offset'] for line in lines[1:]] == [0, 25, 50]
+    assert sum(len(line['predictions']) for line in lines[1:]) == len(rows)
+
+@pytest.mark.parametrize('chunk_size', [0, -1, 'abc', 2.5, True])
+def test_batch_rejects_a_bad_chunk_size(client, log_reg_session, chunk_size):
+    headers, rows = log_reg_session
+    response = client.post('/infer_log_reg_batch', json = {'rows': rows, 'chunk_size': chunk_size}, headers = headers)
+    assert response.status_code == 400
+    assert 'chunk_size' in response.json['error']
@@ -0,0 +1,23 @@
+from concurrency import RouteLimits
+from conftest import upload
+
+
+def test_streamed_fetch_holds_its_slot_until_the_body_is_closed(server, client, regression_frame, monkeypatch):
+    upload(client, 'concurrency_stream.csv', regression_frame)
+    monkeypatch.setattr(server, 'route_limits', RouteLimits({'storage': 1}, 0))
+
+    # a fresh upload is not cached yet, so its records are streamed while the CSV converts
+    response = client.get('/fetch_dataset', query_string = {'file_name': 'concurrency_stream.csv'}, buffered = False)
+    assert response.status_code == 200
+    assert next(response.response).startswith(b'[')
+    with client.get('/fetch_dataset', query_string = {'file_name': 'concurrency_stream.csv'}) as rejected:
+        assert rejected.status_code == 503
+
+    response.close()
+    with client.get('/fetch_dataset', query_string = {'file_name': 'concurrency_stream.csv'}) as cached:
+        assert cached.status_code == 200
+
+def test_failed_view_releases_its_slot(server, client, monkeypatch):
+    monkeypatch.setattr(server, 'route_limits', RouteLimits({'storage': 1}, 0))
+    for _ in range(2):
+        assert client.get('/fetch_dataset', query_string = {'file_name': 'missing.csv'}).status_code == 404
@@ -0,0 +1,103 @@
+import functools
+import io
+import json
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+import dataset_cache
+import object_store
+from dataset_cache import Conversion, DatasetCache
+
+cases = {
+    'text_after_numbers': 'a\n1\n2\n3\nfoo\n',
+    'numbers_after_text': 'a,b\nfoo,1\n2,2\n3,3\n4,4\n',
+    'missing_after_integers': 'a,b\n1,x\n2,y\n,z\n4,w\n',
+    'missing_first': 'a,b\n,\n,\n1,q\n2,r\n',
+    'floats_after_integers': 'a\n1\n2\n3.5\n4\n5\n',
+    'never_filled': 'a,b\n1,\n2,\n3,\n'
+}
+
+
+@pytest.fixture
+def small_chunk_cache(tmp_path):
+    # two-row chunks make every dataset span several independently typed chunks
+    return DatasetCache(str(tmp_path / 'datasets'), 10 ** 9, chunk_rows = 2)
+
+@pytest.mark.parametrize('name', sorted(cases))
+def test_chunked_parse_matches_a_single_read(small_chunk_cache, name):
+    bucket = object_store.bucket('dataset_cache_tests')
+    bucket.blob(f"{name}.csv").upload_from_string(cases[name])
+    blob = bucket.get_blob(f"{name}.csv")
+
+    streamed = pd.concat(list(small_chunk_cache.chunks(blob)), ignore_index = True)
+    cached = small_chunk_cache.frame(blob)
+    expected = pd.read_csv(io.StringIO(cases[name]))
+    assert cached.astype(object).where(cached.notna(), None).to_dict('list') == expected.astype(object).where(expected.notna(), None).to_dict('list')
+    assert len(streamed) == len(expected)
+
+def test_conversion_keeps_chunks_only_for_followers():
+    unfollowed = Conversion()
+    unfollowed.publish('chunk')
+    assert unfollowed.chunks == {}
+    assert unfollowed.join() is None
+
+    conversion = Conversion()
+    fast, slow = conversion.join(), conversion.join()
+    fast_chunks, slow_chunks = conversion.follow(fast), conversion.follow(slow)
+    for chunk in ('first', 'second'):
+        conversion.publish(chunk)
+    assert next(fast_chunks) == 'first' and next(fast_chunks) == 'second'
+    assert sorted(conversion.chunks) == [0, 1]
+    assert next(slow_chunks) == 'first'
+    assert sorted(conversion.chunks) == [1]
+    slow_chunks.close()
+    assert conversion.chunks == {}
+
+def test_stream_reports_a_late_parse_failure_in_band(server, client, monkeypatch):
+    monkeypatch.setattr(server.dataset_cache, 'chunk_rows', 2)
+    body = b'a,b\n' + b'1,2\n' * 10 + b'"unterminated,1\n'
+    object_store.bucket('learning_rate_files').blob('late_failure.csv').upload_from_string(body)
+
+    response = client.get('/fetch_dataset?file_name=late_failure.csv')
+    assert response.status_code == 200
+    rows, error = response.data.rsplit(b'\n', 1)
+    assert rows.startswith(b'[{')
+    assert 'error' in json.loads(error)
+
+def test_publish_waits_for_a_follower_that_is_a_full_backlog_behind():
+    conversion = Conversion(max_backlog = 2, lag_seconds = 10)
+    chunks = conversion.follow(conversion.join())
+    publisher = threading.Thread(target = lambda: [conversion.publish(index) for index in range(5)])
+    publisher.start()
+    time.sleep(0.2)
+    assert conversion.published == 2 and publisher.is_alive()
+
+    assert [next(chunks) for _ in range(5)] == list(range(5))
+    publisher.join(5)
+    assert len(conversion.chunks) <= 2
+
+def test_a_stalled_follower_is_detached_instead_of_stalling_the_parse():
+    conversion = Conversion(max_backlog = 1, lag_seconds = 0.05)
+    follower = conversion.join()
+    for chunk in range(3):
+        conversion.publish(chunk)
+    assert follower in conversion.detached
+    assert conversion.chunks == {}
+    assert list(conversion.follow(follower)) == []
+
+def test_a_detached_reader_finishes_from_the_cached_file(small_chunk_cache, monkeypatch):
+    monkeypatch.setattr(dataset_cache, 'Conversion', functools.partial(Conversion, max_backlog = 1, lag_seconds = 0.05))
+    body = 'a,b\n' + ''.join(f"{index},{index * 2}\n" for index in range(21))
+    bucket = object_store.bucket('dataset_cache_tests')
+    bucket.blob('detached.csv').upload_from_string(body)
+
+    chunks = small_chunk_cache.chunks(bucket.get_blob('detached.csv'))
+    first = next(chunks)
+    time.sleep(0.5)
+    rest = pd.concat(list(chunks), ignore_index = True)
+    streamed = pd.concat([first, rest], ignore_index = True)
+    assert streamed['a'].tolist() == list(range(21))
+    assert streamed['b'].tolist() == [index * 2 for index in range(21)]
@@ -0,0 +1,22 @@
+from disk_cache import MemoryLRU
+
+
+def test_memory_lru_evicts_least_recently_used_by_size():
+    memory = MemoryLRU(10)
+    memory.put('a', 'A', 4)
+    memory.put('b', 'B', 4)
+    assert memory.get('a') == 'A'
+    memory.put('c', 'C', 4)
+    assert 'b' not in memory
+    assert memory.get('a') == 'A' and memory.get('c') == 'C'
+    assert memory.total_bytes == 8
+
+def test_memory_lru_keeps_an_oversized_newest_entry_and_replaces_in_place():
+    memory = MemoryLRU(10)
+    memory.put('a', 'A', 4)
+    memory.put('a', 'A2', 6)
+    assert memory.total_bytes == 6
+    memory.put('big', 'BIG', 50)
+    assert 'a' not in memory and memory.get('big') == 'BIG'
+    memory.discard('big')
+    assert memory.total_bytes == 0 and memory.get('big') is None
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+
+from conftest import upload
+
+from jobs import JobManager
+
+
+def wait_until(condition, timeout = 10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+def add(a, b, context):
+    return a + b
+
+def cancellable(started, context):
+    started.set()
+    while not context.cancelled():
+        time.sleep(0.01)
+    raise RuntimeError('job cancelled')
+
+@pytest.fixture
+def owner_and_peer(tmp_path):
+    # two managers over one directory stand in for two web worker processes
+    directory = str(tmp_path / 'jobs')
+    return JobManager(1, directory, cpus = 1), JobManager(1, directory, cpus = 1)
+
+def test_another_worker_sees_status_progress_and_result(owner_and_peer):
+    owner, peer = owner_and_peer
+    job_id = owner.submit_driver('add', add, (2, 3), on_success = lambda value: {'sum': value})
+    wait_until(lambda: owner.get(job_id).finished_at is not None)
+
+    shared = peer.get(job_id)
+    assert shared is not owner.get(job_id)
+    assert shared.status == 'succeeded'
+    assert shared.result == {'sum': 5}
+    assert peer.describe(shared)['progress'] == 1.0
+
+def test_another_worker_can_cancel_a_running_job(owner_and_peer):
+    owner, peer = owner_and_peer
+    started = threading.Event()
+    job_id = owner.submit_driver('cancellable', cancellable, (started,))
+    assert started.wait(5)
+    assert peer.get(job_id).status == 'running'
+
+    assert peer.cancel(peer.get(job_id)) == 'cancelling'
+    wait_until(lambda: peer.get(job_id).finished_at is not None)
+    assert peer.get(job_id).status == 'cancelled'
+    assert owner.get(job_id).status == 'cancelled'
+
+def test_unknown_and_malformed_ids_are_not_found(owner_and_peer):
+    owner, _ = owner_and_peer
+    assert owner.get('0' * 32) is None
+    assert owner.get('../../etc/passwd') is None
+
+def test_cancelling_a_finished_job_keeps_its_result(owner_and_peer):
+    owner, peer = owner_and_peer
+    job_id = owner.submit_driver('add', add, (2, 3))
+    wait_until(lambda: owner.get(job_id).finished_at is not None)
+
+    assert owner.cancel(owner.get(job_id)) == 'succeeded'
+    assert peer.cancel(peer.get(job_id)) == 'succeeded'
+    assert owner.get(job_id).status == 'succeeded'
+    assert peer.get(job_id).result == 5
+
+def test_job_result_after_a_late_cancel(client, session_headers, regression_frame):
+    upload(client, 'late_cancel.csv', regression_frame)
+    body = {'dataset_name': 'late_cancel.csv', 'features': ['a', 'b', 'c'], 'target': 'y'}
+    client.post('/train_lin_reg', json = body, headers = session_headers)
+    job_id = client.post('/train_lin_reg', json = dict(body, **{'async': True}), headers = session_headers).json['job_id']
+    wait_until(lambda: client.get('/job_status', query_string = {'job_id': job_id}).json['status'] == 'succeeded')
+
+    assert client.post('/cancel_job', json = {'job_id': job_id}).json['status'] == 'succeeded'
+    assert client.get('/job_result', query_string = {'job_id': job_id}).status_code == 200
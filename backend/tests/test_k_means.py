@@ -0,0 +1,28 @@
+import io
+import time
+
+import pandas as pd
+
+from conftest import upload
+
+
+def test_streaming_labels_are_pinned_to_the_dataset_they_were_fit_on(client, session_headers, regression_frame):
+    upload(client, 'pinned.csv', regression_frame)
+    body = {'dataset_name': 'pinned.csv', 'features': ['a', 'b'], 'n_clusters': 3, 'mode': 'streaming', 'batch_size': 100}
+    trained = client.post('/train_k_means', json = body, headers = session_headers)
+    assert trained.status_code == 200, trained.json
+
+    loaded = client.post('/load_k_means', json = {'features': ['a', 'b']}, headers = session_headers)
+    assert loaded.status_code == 200
+    expected = pd.read_csv(io.StringIO(regression_frame.to_csv(index = False)))
+    assert pd.DataFrame(loaded.json['new_dataset'])['a'].tolist() == expected['a'].tolist()
+
+    # local generations come from the file's mtime, so make sure the rewrite gets a new one
+    time.sleep(0.01)
+    upload(client, 'pinned.csv', regression_frame.assign(a = regression_frame['a'] + 100))
+    assert client.post('/load_k_means', json = {'features': ['a', 'b']}, headers = session_headers).status_code == 409
+    saved = client.post('/save_unsupervised', json = {
+        'dataset_name': 'pinned.csv', 'features': ['a', 'b'], 'algo_name': 'k_means', 'model_name': 'pinned'
+    }, headers = session_headers)
+    assert saved.status_code == 409
+    assert 'changed' in saved.json['error']
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from listing_index import ListingIndex
+
+
+def test_pages_follow_prefix_and_token():
+    index = ListingIndex(lambda: ['b.csv', 'a.csv', 'ab.csv', '_profiles/a.json'], ttl = 60, excluded_prefixes = ('_profiles/',))
+    assert index.page() == (['a.csv', 'ab.csv', 'b.csv'], None)
+    assert index.page(prefix = 'a') == (['a.csv', 'ab.csv'], None)
+    assert index.page(limit = 2) == (['a.csv', 'ab.csv'], 'ab.csv')
+    assert index.page(page_token = 'ab.csv', limit = 2) == (['b.csv'], None)
+
+def test_writes_apply_immediately_and_skip_excluded_names():
+    index = ListingIndex(lambda: ['a.csv'], ttl = 60, excluded_prefixes = ('_profiles/',))
+    index.page()
+    index.add('c.csv')
+    index.add('_profiles/c.csv.json')
+    index.remove('a.csv')
+    assert index.page() == (['c.csv'], None)
+
+def test_stale_lookup_refreshes_in_background_and_replays_writes():
+    listed = threading.Event()
+    release = threading.Event()
+    stored = ['a.csv']
+
+    def list_names():
+        names = list(stored)
+        listed.set()
+        release.wait(5)
+        return names
+
+    index = ListingIndex(list_names, ttl = 0.01)
+    release.set()
+    index.page()
+    listed.clear()
+    release.clear()
+    stored.append('b.csv')
+    time.sleep(0.02)
+
+    # the stale lookup answers at once and the refresh lists in the background
+    assert index.page() == (['a.csv'], None)
+    assert listed.wait(5)
+    # a write landing while the refresh is listing must survive the refresh's result
+    stored.append('c.csv')
+    index.add('c.csv')
+    release.set()
+    deadline = time.monotonic() + 5
+    while index.refreshing_pid is not None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert index.names == ['a.csv', 'b.csv', 'c.csv']
+
+def test_page_rejects_a_non_positive_limit():
+    index = ListingIndex(lambda: ['a.csv'], ttl = 60)
+    with pytest.raises(ValueError):
+        index.page(limit = 0)
+    with pytest.raises(ValueError):
+        index.page(limit = -1)
+
+@pytest.mark.parametrize('limit', ['0', '-1', 'abc', ''])
+def test_listing_routes_reject_a_bad_limit(client, limit):
+    for route in ('/fetch_data_names', '/fetch_model_names'):
+        response = client.get(route, query_string = {'limit': limit})
+        assert response.status_code == 400
+        assert 'limit' in response.json['error']
+
+def test_a_write_in_another_worker_invalidates_through_the_stamp(tmp_path):
+    stored = ['a.csv']
+    stamp_path = str(tmp_path / 'listings' / 'data.stamp')
+    # two indexes over one bucket and one stamp file stand in for two worker processes
+    writer = ListingIndex(lambda: list(stored), ttl = 60, stamp_path = stamp_path)
+    reader = ListingIndex(lambda: list(stored), ttl = 60, stamp_path = stamp_path)
+    assert writer.page() == (['a.csv'], None)
+    assert reader.page() == (['a.csv'], None)
+
+    stored.append('b.csv')
+    writer.add('b.csv')
+    # well inside the TTL, the reader still lists again because the stamp moved
+    assert reader.page() == (['a.csv', 'b.csv'], None)
+
+    stored.remove('a.csv')
+    reader.remove('a.csv')
+    assert writer.page() == (['b.csv'], None)
+
+def test_own_writes_do_not_force_a_listing(tmp_path):
+    calls = []
+
+    def list_names():
+        calls.append(1)
+        return ['a.csv']
+
+    index = ListingIndex(list_names, ttl = 60, stamp_path = str(tmp_path / 'data.stamp'))
+    index.page()
+    index.add('b.csv')
+    assert index.page() == (['a.csv', 'b.csv'], None)
+    assert len(calls) == 1
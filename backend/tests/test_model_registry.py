@@ -0,0 +1,39 @@
+import os
+
+from joblib import dump
+
+from model_registry import ModelRegistry
+
+
+class Model:
+    def __init__(self, weights):
+        self.weights = weights
+
+def test_put_links_a_source_file_and_shares_the_compiled_predictor(tmp_path):
+    compiled = []
+
+    def compiler(model):
+        compiled.append(model)
+        return object()
+
+    registry = ModelRegistry(str(tmp_path / 'models'), 10 ** 9, 10 ** 9, compiler = compiler)
+    model = Model([1.0, 2.0])
+    source_path = str(tmp_path / 'cached.joblib')
+    dump(model, source_path)
+
+    first = registry.put('a', 'lin_reg', model, source_path, 'result-key')
+    second = registry.put('b', 'lin_reg', model, source_path, 'result-key')
+    # the registry's files are links to the cached file, not new copies
+    assert first == second == (os.stat(source_path).st_ino, os.stat(source_path).st_size)
+    assert len(compiled) == 1
+    assert registry.entry('b', 'lin_reg').predictor is registry.entry('a', 'lin_reg').predictor
+
+    # registering the same file again for a session is a no-op
+    assert registry.put('a', 'lin_reg', model, source_path, 'result-key') == first
+    assert len(compiled) == 1
+
+def test_put_without_a_source_still_writes_the_model(tmp_path):
+    registry = ModelRegistry(str(tmp_path / 'models'), 10 ** 9, 10 ** 9)
+    registry.put('a', 'lin_reg', Model([3.0]))
+    registry.memory.discard(registry.key('a', 'lin_reg'))
+    assert registry.get('a', 'lin_reg').weights == [3.0]
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import param_search
+
+
+@pytest.mark.parametrize('space', [
+    {'max_samples': [0]},
+    {'max_samples': [0.0, 0.5]},
+    {'max_samples': [1.5]},
+    {'max_samples': {'low': 0, 'high': 1}},
+    {'learning_rate': [0]},
+    {'n_trees': [10.5]},
+    {'n_trees': []}
+])
+def test_parse_space_rejects_values_the_fitters_refuse(space):
+    algo_name = 'grad_boost_reg' if 'learning_rate' in space else 'random_forest'
+    with pytest.raises(ValueError):
+        param_search.parse_space(algo_name, space)
+
+def test_max_samples_always_samples_a_fraction():
+    choices = param_search.parse_space('random_forest', {'max_samples': [1, 0.5]})
+    assert choices['max_samples'] == ('choice', [1.0, 0.5])
+    assert all(isinstance(value, float) for value in choices['max_samples'][1])
+
+    ranged = param_search.parse_space('random_forest', {'max_samples': {'low': 1, 'high': 1}})
+    value = param_search.sample_value(ranged['max_samples'], np.random.default_rng(0))
+    assert value == 1.0 and isinstance(value, float)
+
+def test_integer_ranges_sample_integers():
+    space = param_search.parse_space('random_forest', {'n_trees': {'low': 5, 'high': 50, 'log': True}})
+    rng = np.random.default_rng(1)
+    values = [param_search.sample_value(space['n_trees'], rng) for _ in range(20)]
+    assert all(isinstance(value, int) and 5 <= value <= 50 for value in values)
@@ -0,0 +1,77 @@
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from conftest import upload
+
+
+def test_upload_fetch_train_save_load(client, session_headers, regression_frame):
+    upload(client, 'round_trip.csv', regression_frame)
+    assert 'round_trip.csv' in client.get('/fetch_data_names').json
+
+    # the first read streams the parse, the second is served from the Arrow cache
+    cold = client.get('/fetch_dataset?file_name=round_trip.csv').json
+    warm = client.get('/fetch_dataset?file_name=round_trip.csv')
+    assert warm.headers['X-Total-Count'] == '500'
+    assert cold == warm.json
+    pd.testing.assert_frame_equal(pd.DataFrame(warm.json), regression_frame)
+
+    body = {'dataset_name': 'round_trip.csv', 'features': ['a', 'b', 'c'], 'target': 'y'}
+    trained = client.post('/train_lin_reg', json = body, headers = session_headers)
+    assert trained.status_code == 200, trained.json
+    assert abs(trained.json['coefficients']['a'] - 3) < 0.01
+
+    saved = client.post('/save_model', json = dict(body, algo_name = 'lin_reg', model_name = 'round_trip'), headers = session_headers)
+    assert saved.status_code == 200, saved.json
+    assert 'round_trip.zip' in client.get('/fetch_model_names').json
+
+    loaded = client.post('/load_model', json = {'model_name': 'round_trip.zip'}, headers = {'X-Session-Id': 'reloaded'})
+    assert loaded.status_code == 200, loaded.json
+    assert loaded.json['metadata']['algo_name'] == 'lin_reg'
+    pd.testing.assert_frame_equal(pd.DataFrame(loaded.json['dataset']), regression_frame)
+
+    features = {'a': 0.5, 'b': 0.25, 'c': 0.1}
+    before = client.post('/infer_lin_reg', json = {'features': features}, headers = session_headers).json['prediction']
+    after = client.post('/infer_lin_reg', json = {'features': features}, headers = {'X-Session-Id': 'reloaded'}).json['prediction']
+    assert np.allclose(before, after)
+
+def test_delete_removes_dataset(client, regression_frame):
+    upload(client, 'deleted.csv', regression_frame)
+    assert client.post('/delete_data', json = {'data_name': 'deleted.csv'}).status_code == 200
+    assert 'deleted.csv' not in client.get('/fetch_data_names').json
+    assert client.get('/fetch_dataset?file_name=deleted.csv').status_code == 404
+
+def test_reupload_invalidates_caches(client, session_headers, regression_frame):
+    upload(client, 'invalidated.csv', regression_frame)
+    body = {
+        'dataset_name': 'invalidated.csv', 'features': ['a', 'b', 'c'], 'target': 'y',
+        'n_trees': 5, 'learning_rate': 0.1, 'max_depth': 2
+    }
+    assert client.post('/train_grad_boost_reg', json = body, headers = session_headers).headers['X-Cache'] == 'miss'
+    assert client.post('/train_grad_boost_reg', json = body, headers = session_headers).headers['X-Cache'] == 'hit'
+    client.get('/fetch_dataset?file_name=invalidated.csv')
+
+    # local generations come from the file's mtime, so make sure the rewrite gets a new one
+    time.sleep(0.01)
+    changed = regression_frame.assign(y = -regression_frame['y'])
+    upload(client, 'invalidated.csv', changed)
+    assert client.post('/train_grad_boost_reg', json = body, headers = session_headers).headers['X-Cache'] == 'miss'
+    fetched = client.get('/fetch_dataset?file_name=invalidated.csv&columns=y').json
+    assert [row['y'] for row in fetched] == pd.read_csv(io.StringIO(changed.to_csv(index = False)))['y'].tolist()
+
+def test_async_cache_hit_finishes_through_the_job_api(client, session_headers, regression_frame):
+    upload(client, 'async_hit.csv', regression_frame)
+    body = {'dataset_name': 'async_hit.csv', 'features': ['a', 'b', 'c'], 'target': 'y'}
+    trained = client.post('/train_lin_reg', json = body, headers = session_headers)
+    assert trained.headers['X-Cache'] == 'miss'
+
+    job_id = client.post('/train_lin_reg', json = dict(body, **{'async': True}), headers = session_headers).json['job_id']
+    deadline = time.monotonic() + 30
+    result = client.get('/job_result', query_string = {'job_id': job_id})
+    while result.status_code == 202 and time.monotonic() < deadline:
+        time.sleep(0.05)
+        result = client.get('/job_result', query_string = {'job_id': job_id})
+    assert result.status_code == 200
+    assert result.json == trained.json
@@ -0,0 +1,39 @@
+import io
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+import serialization
+from conftest import upload
+
+awkward_floats = [1.2345678901234567e-7, 0.27060200385256244, 1e300, 5e-324, -0.0, 2 / 3, 123456789.12345679, 1.0]
+
+
+def test_frames_and_arrays_round_trip_exactly():
+    rng = np.random.default_rng(1)
+    frame = pd.DataFrame({
+        'x': awkward_floats + rng.random(100).tolist(),
+        'n': np.arange(108),
+        's': ['a,b', 'c"d'] * 54
+    })
+    decoded = json.loads(serialization.dumps({'rows': frame, 'scores': frame['x'].to_numpy()}))
+    assert decoded['rows'] == frame.to_dict(orient = 'records')
+    assert decoded['scores'] == frame['x'].tolist()
+    assert [math.copysign(1, value) for value in decoded['scores'][:5]] == [1, 1, 1, 1, -1]
+
+def test_missing_values_become_null():
+    frame = pd.DataFrame({'x': [1.5, np.nan], 's': ['a', None]})
+    assert json.loads(serialization.dumps(frame)) == [{'s': 'a', 'x': 1.5}, {'s': None, 'x': None}]
+
+def test_fetched_dataset_round_trips_exactly(client):
+    x = [value for value in awkward_floats if value < 1e200]
+    frame = pd.DataFrame({'x': x, 'y': np.random.default_rng(2).random(len(x))})
+    upload(client, 'exact.csv', frame)
+    # compare with the server's own parse, which is what the cache holds
+    expected = pd.read_csv(io.StringIO(frame.to_csv(index = False)))
+    for _ in range(2):
+        assert client.get('/fetch_dataset?file_name=exact.csv').json == expected.to_dict(orient = 'records')
+    columns = client.get('/fetch_dataset?file_name=exact.csv&layout=columns').json
+    assert columns == {name: expected[name].tolist() for name in expected.columns}
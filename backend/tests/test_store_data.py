@@ -0,0 +1,41 @@
+import io
+import os
+
+import pytest
+
+import object_store
+
+
+def test_unprofilable_csv_is_stored_without_a_profile(client):
+    body = b'a,b\n1,2\n' + b'3,4\n' * 1000 + b'5,6,7\n' + b'8,9\n'
+    response = client.post('/store_data', data = {'file': (io.BytesIO(body), 'ragged.csv')})
+    assert response.status_code == 200, response.json
+    assert 'ragged.csv' in client.get('/fetch_data_names').json
+    assert object_store.bucket('learning_rate_files').blob('ragged.csv').download_as_bytes() == body
+    assert not object_store.bucket('learning_rate_files').blob('_profiles/ragged.csv.json').exists()
+
+def test_overflowing_values_do_not_block_the_upload(client):
+    body = b'x\n1e300\n2e300\n'
+    assert client.post('/store_data', data = {'file': (io.BytesIO(body), 'huge.csv')}).status_code == 200
+    assert object_store.bucket('learning_rate_files').blob('huge.csv').exists()
+
+class FailingStream(io.RawIOBase):
+    def __init__(self):
+        self.sent = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self.sent:
+            raise ConnectionError('client went away')
+        buffer[:4] = b'a,b\n'
+        self.sent = 4
+        return 4
+
+def test_failed_copy_commits_nothing():
+    blob = object_store.bucket('learning_rate_files').blob('partial.csv')
+    with pytest.raises(ConnectionError):
+        blob.upload_from_file(FailingStream())
+    assert not blob.exists()
+    assert not [name for name in os.listdir(blob.bucket.directory) if name.startswith('.upload-')]
@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import upload
+
+
+@pytest.fixture
+def cold_small_chunks(server, monkeypatch):
+    # small parse chunks make a cold read go through many incremental Arrow writes
+    monkeypatch.setattr(server.dataset_cache, 'chunk_rows', 97)
+
+def test_streaming_lin_reg_on_a_cold_cache(client, session_headers, regression_frame, cold_small_chunks):
+    upload(client, 'streaming_lin_reg.csv', regression_frame)
+    body = {'dataset_name': 'streaming_lin_reg.csv', 'features': ['a', 'b', 'c'], 'target': 'y', 'cache': False}
+    streamed = client.post('/train_lin_reg', json = dict(body, mode = 'streaming', batch_size = 64), headers = session_headers)
+    full = client.post('/train_lin_reg', json = body, headers = session_headers)
+    assert streamed.status_code == 200, streamed.json
+    for feature, coefficient in full.json['coefficients'].items():
+        assert streamed.json['coefficients'][feature] == pytest.approx(coefficient, abs = 1e-9)
+
+def test_streaming_log_reg_on_a_cold_cache(client, session_headers, cold_small_chunks):
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame(rng.normal(size = (400, 2)), columns = ['a', 'b'])
+    df['label'] = np.where(df['a'] + df['b'] > 0, 'yes', 'no')
+    upload(client, 'streaming_log_reg.csv', df)
+    response = client.post('/train_log_reg', json = {
+        'dataset_name': 'streaming_log_reg.csv', 'features': ['a', 'b'], 'target': 'label',
+        'mode': 'streaming', 'batch_size': 50, 'max_passes': 5
+    }, headers = session_headers)
+    assert response.status_code == 200, response.json
+    assert sorted(response.json['classes']) == ['no', 'yes']
+    prediction = client.post('/infer_log_reg', json = {'features': {'a': 2.0, 'b': 2.0}}, headers = session_headers)
+    assert prediction.json['prediction'] == ['yes']
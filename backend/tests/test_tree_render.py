@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+import tree_render
+from conftest import upload
+
+
+@pytest.fixture
+def forest_session(client, session_headers, regression_frame, monkeypatch):
+    labelled = regression_frame.assign(y = np.where(regression_frame['y'] > regression_frame['y'].median(), 'high', 'low'))
+    upload(client, 'tree_render.csv', labelled)
+    trained = client.post('/train_random_forest', json = {
+        'dataset_name': 'tree_render.csv', 'features': ['a', 'b', 'c'], 'target': 'y', 'n_trees': 3, 'max_depth': 2
+    }, headers = session_headers)
+    assert trained.status_code == 200
+    assert 'error' not in trained.json, trained.json
+    # Graphviz is a system binary, so the rendering itself is replaced by an image of the requested size
+    monkeypatch.setattr(tree_render, 'render_tree', lambda tree, size, image_format: f"{size[0]}x{size[1]}".encode())
+    return session_headers
+
+def test_graph_renders_within_the_cap(server, client, forest_session):
+    response = client.post('/graph_random_forest', json = {'tree_index': 3, 'width': 200, 'height': server.max_image_side, 'format': 'png'}, headers = forest_session)
+    assert response.status_code == 200
+    assert response.data == f"200x{server.max_image_side}".encode()
+
+@pytest.mark.parametrize('body', [
+    {'tree_index': 1, 'width': 'abc'},
+    {'tree_index': 1, 'width': 0},
+    {'tree_index': 1, 'height': -5},
+    {'tree_index': 1, 'width': 100000},
+    {'tree_index': 1, 'height': 2.5},
+    {'tree_index': 0},
+    {'tree_index': 4},
+    {}
+])
+def test_graph_rejects_bad_sizes_and_indexes(client, forest_session, body):
+    response = client.post('/graph_random_forest', json = body, headers = forest_session)
+    assert response.status_code == 400
+    assert 'trained' not in response.json['error']
+    assert ('width and height' if 'width' in body or 'height' in body else 'tree') in response.json['error'].lower()
+
+def test_tree_structure_for_a_valid_index(client, forest_session):
+    response = client.post('/tree_random_forest', json = {'tree_index': 3, 'root': 0, 'max_depth': 1}, headers = forest_session)
+    assert response.status_code == 200
+    assert response.json['feature_names'] == ['a', 'b', 'c']
+
+@pytest.mark.parametrize('body', [
+    {'tree_index': 0},
+    {'tree_index': -1},
+    {'tree_index': 4},
+    {'tree_index': 1, 'root': 'abc'},
+    {'tree_index': 1, 'root': -1},
+    {'tree_index': 1, 'max_depth': 'abc'},
+    {'tree_index': 1, 'max_depth': -2},
+    {'tree_index': 1, 'root': 10 ** 6}
+])
+def test_tree_structure_rejects_bad_indexes_and_nodes(client, forest_session, body):
+    response = client.post('/tree_random_forest', json = body, headers = forest_session)
+    assert response.status_code == 400
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import training
+
+
+@pytest.fixture
+def labelled_frame():
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame(rng.normal(size = (120, 2)), columns = ['a', 'b'])
+    df['label'] = np.where(df['a'] > 0, 'high', 'low')
+    return df
+
+def forest_body(df, **extra):
+    return dict({'dataset': df.to_dict(orient = 'records'), 'features': ['a', 'b'], 'target': 'label', 'n_trees': 4}, **extra)
+
+def test_warm_start_grows_a_forest_with_the_same_classes(client, session_headers, labelled_frame):
+    assert client.post('/train_random_forest', json = forest_body(labelled_frame), headers = session_headers).status_code == 200
+    grown = client.post('/train_random_forest', json = forest_body(labelled_frame, n_trees = 8, warm_start = True), headers = session_headers)
+    assert grown.status_code == 200, grown.json
+
+@pytest.mark.parametrize('relabel', [
+    lambda df: df.assign(label = np.where(df['b'] > 1, 'extreme', df['label'])),
+    lambda df: df.assign(label = df['label'].map({'high': 'up', 'low': 'down'}))
+])
+def test_warm_start_rejects_different_target_classes(client, session_headers, labelled_frame, relabel):
+    assert client.post('/train_random_forest', json = forest_body(labelled_frame), headers = session_headers).status_code == 200
+    response = client.post('/train_random_forest', json = forest_body(relabel(labelled_frame), n_trees = 8, warm_start = True), headers = session_headers)
+    assert response.status_code == 400
+    assert 'classes' in response.json['error']
+
+def test_fit_random_forest_rejects_different_target_classes(labelled_frame):
+    base_model, _ = training.fit_random_forest(labelled_frame, {'features': ['a', 'b'], 'target': 'label', 'n_trees': 4}, None)
+    relabelled = labelled_frame.assign(label = labelled_frame['label'].where(labelled_frame['b'] < 1, 'extreme'))
+    with pytest.raises(ValueError, match = 'classes'):
+        training.fit_random_forest(relabelled, {'features': ['a', 'b'], 'target': 'label', 'n_trees': 8, 'warm_start_model': base_model}, None)
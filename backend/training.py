@@ -0,0 +1,476 @@
+import copy
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from sklearn.linear_model import LinearRegression, LogisticRegression, SGDClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingRegressor, HistGradientBoostingRegressor
+from sklearn.cluster import KMeans, MiniBatchKMeans
+
+import object_store
+from dataset_cache import shared_dataset_cache
+from tree_export import boosting_trees, tree_arrays
+
+
+class NullContext:
+    def report(self, progress, **info):
+        pass
+
+    def cancelled(self):
+        return False
+
+
+def get_blob(bucket_name, blob_name):
+    bucket = object_store.bucket(bucket_name)
+    blob = bucket.get_blob(blob_name)
+    if blob is None:
+        raise FileNotFoundError(f"dataset '{blob_name}' not found")
+    return blob
+
+class DatasetChangedError(ValueError):
+    """The stored dataset a model refers to was overwritten after the model was trained."""
+
+
+def pinned_blob(source, generation):
+    """The blob a model was trained on, provided it still holds the generation recorded at fit time."""
+    blob = get_blob(source[1], source[2])
+    if generation is not None and blob.generation != generation:
+        raise DatasetChangedError(f"dataset '{source[2]}' has changed since the model was trained")
+    return blob
+
+def load_source(source):
+    kind = source[0]
+    if kind == 'frame':
+        return source[1]
+    if kind == 'blob':
+        return shared_dataset_cache().frame(get_blob(source[1], source[2]))
+    raise ValueError(f"unknown dataset source '{kind}'")
+
+def load_table(source, columns):
+    kind = source[0]
+    if kind == 'frame':
+        return pa.Table.from_pandas(source[1][columns], preserve_index = False)
+    if kind == 'blob':
+        return shared_dataset_cache().table(get_blob(source[1], source[2]), columns)
+    raise ValueError(f"unknown dataset source '{kind}'")
+
+def target_classes(source, target):
+    return np.unique(load_table(source, [target]).column(0).to_numpy())
+
+def same_classes(model, classes):
+    # warm-started trees vote by class position, so the new fit must see exactly the classes the forest was grown on
+    return np.array_equal(np.asarray(classes), model.classes_)
+
+def dataset_fingerprint(source):
+    kind = source[0]
+    if kind == 'frame':
+        df = source[1]
+        digest = hashlib.sha256(json.dumps([str(column) for column in df.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(df, index = False).to_numpy().tobytes())
+        return f"frame:{digest.hexdigest()}"
+    if kind == 'blob':
+        blob = get_blob(source[1], source[2])
+        return f"blob:{source[1]}/{blob.name}@{blob.generation}"
+    raise ValueError(f"unknown dataset source '{kind}'")
+
+def read_chunk(table, offset, chunk_rows):
+    return table.slice(offset, chunk_rows).to_pandas()
+
+def lin_reg_summary(model, features):
+    coefficients = model.coef_.tolist()
+    return {
+        'coefficients': {features[i]: coefficients[i] for i in range(len(features))}
+    }
+
+def log_reg_summary(model, features):
+    coefficients = model.coef_
+    if coefficients.ndim == 1:
+        coefficients = coefficients.reshape(1, -1)
+
+    intercepts = model.intercept_
+    if intercepts.ndim == 0:
+        intercepts = np.array([intercepts])
+
+    coefficients_map = {class_label: dict(zip(features, coeff)) for class_label, coeff in zip(model.classes_, coefficients)}
+    intercepts_map = {class_label: intercept for class_label, intercept in zip(model.classes_, intercepts)}
+
+    return {
+        'intercepts': intercepts_map,
+        'coefficients': coefficients_map,
+        'classes': model.classes_.tolist()
+    }
+
+def random_forest_summary(model, features):
+    summary = {
+        'feature_importance': dict(zip(features, model.feature_importances_.tolist())),
+        'estimators': len(model.estimators_),
+        'classes': list(model.classes_)
+    }
+    if model.oob_score and hasattr(model, 'oob_score_'):
+        summary['oob_score'] = model.oob_score_
+    return summary
+
+def grad_boost_reg_summary(model, features):
+    if isinstance(model, HistGradientBoostingRegressor):
+        return hist_grad_boost_reg_summary(model, features)
+    return {
+        'feature_importance': dict(zip(features, model.feature_importances_.tolist())),
+        'estimators': len(model.estimators_),
+        'train_scores': model.train_score_,
+        'learning_rate': model.learning_rate,
+        'max_depth': model.max_depth
+    }
+
+def hist_grad_boost_reg_summary(model, features):
+    # split gains summed per feature, the histogram analogue of impurity-based importance
+    gains = np.zeros(len(features))
+    for tree in boosting_trees(model):
+        arrays = tree_arrays(tree)
+        internal = arrays['children_left'] != -1
+        np.add.at(gains, arrays['feature'][internal], arrays['gain'][internal])
+    total = gains.sum()
+    importance = gains / total if total > 0 else gains
+
+    # scores are negated losses, and the first entry is the constant baseline
+    summary = {
+        'feature_importance': dict(zip(features, importance.tolist())),
+        'estimators': model.n_iter_,
+        'train_scores': -model.train_score_[1:],
+        'learning_rate': model.learning_rate,
+        'max_depth': model.max_depth,
+        'engine': 'hist'
+    }
+    if len(model.validation_score_):
+        summary['validation_scores'] = -model.validation_score_[1:]
+    return summary
+
+class ClusterAccumulator:
+    """Per-cluster sizes, inertias and point-to-center distances, accumulated one chunk at a time."""
+
+    def __init__(self, centers):
+        self.centers = np.asarray(centers, dtype = np.float64)
+        n_clusters = len(self.centers)
+        self.sizes = np.zeros(n_clusters, dtype = np.int64)
+        self.inertias = np.zeros(n_clusters)
+        self.distance_sums = np.zeros(n_clusters)
+        self.max_distances = np.zeros(n_clusters)
+
+    def add(self, x, labels):
+        x = np.asarray(x, dtype = np.float64)
+        labels = np.asarray(labels, dtype = np.intp)
+        n_clusters = len(self.centers)
+
+        distances = np.sqrt(((x - self.centers[labels]) ** 2).sum(axis = 1))
+        self.sizes += np.bincount(labels, minlength = n_clusters)
+        self.inertias += np.bincount(labels, weights = distances ** 2, minlength = n_clusters)
+        self.distance_sums += np.bincount(labels, weights = distances, minlength = n_clusters)
+        np.maximum.at(self.max_distances, labels, distances)
+
+    def statistics(self):
+        mean_distances = np.divide(self.distance_sums, self.sizes, out = np.zeros(len(self.sizes)), where = self.sizes > 0)
+        center_distances = np.sqrt(((self.centers[:, None, :] - self.centers[None, :, :]) ** 2).sum(axis = 2))
+        return {
+            'cluster_inertias': {str(i): float(inertia) for i, inertia in enumerate(self.inertias)},
+            'cluster_sizes': {str(i): int(size) for i, size in enumerate(self.sizes)},
+            'cluster_mean_distances': {str(i): float(distance) for i, distance in enumerate(mean_distances)},
+            'cluster_max_distances': {str(i): float(distance) for i, distance in enumerate(self.max_distances)},
+            'center_distances': center_distances.tolist()
+        }
+
+def cluster_statistics(x, labels, centers):
+    accumulator = ClusterAccumulator(centers)
+    accumulator.add(x, labels)
+    return accumulator.statistics()
+
+def k_means_summary(model, features, statistics):
+    centers = {str(i): {str(feature): float(center[j]) for j, feature in enumerate(features)} for i, center in enumerate(model.cluster_centers_)}
+
+    class_labels = [class_label for class_label in range(model.n_clusters)]
+
+    return dict(statistics, centers = centers, class_labels = class_labels)
+
+def fit_lin_reg(df, params, context):
+    features = params['features']
+    model = LinearRegression()
+    model.fit(df[features], df[params['target']])
+    return model, lin_reg_summary(model, features)
+
+def fit_log_reg(df, params, context):
+    features = params['features']
+    x = df[features]
+    y = df[params['target']]
+
+    unique_classes = y.nunique()
+    if unique_classes == 2:
+        model = LogisticRegression(multi_class = 'auto', solver = 'liblinear')
+    elif unique_classes > 2:
+        model = LogisticRegression(multi_class = 'multinomial', solver = 'lbfgs')
+    model.fit(x, y)
+    return model, log_reg_summary(model, features)
+
+def fit_random_forest(df, params, context):
+    features = params['features']
+    settings = {
+        'n_estimators': params['n_trees'],
+        'oob_score': params.get('oob_score', False),
+        'max_samples': params.get('max_samples'),
+        'n_jobs': params.get('n_jobs')
+    }
+
+    base_model = params.get('warm_start_model')
+    if base_model is not None:
+        if not same_classes(base_model, np.unique(df[params['target']])):
+            raise ValueError('warm start requires the same target classes as the trained forest')
+        # grow a copy so the registered forest keeps serving while the new trees fit
+        model = copy.copy(base_model)
+        model.estimators_ = list(base_model.estimators_)
+        model.set_params(warm_start = True, **settings)
+    else:
+        model = RandomForestClassifier(**settings)
+    model.fit(df[features], df[params['target']])
+    return model, random_forest_summary(model, features)
+
+def fit_grad_boost_reg(df, params, context):
+    if params.get('engine') == 'hist':
+        return fit_hist_grad_boost_reg(df, params, context)
+
+    features = params['features']
+    n_trees = params['n_trees']
+    report_every = max(1, n_trees // 100)
+
+    def monitor(iteration, estimator, local_vars):
+        if (iteration + 1) % report_every == 0:
+            context.report((iteration + 1) / n_trees)
+        return context.cancelled()
+
+    model = GradientBoostingRegressor(n_estimators = n_trees, learning_rate = params['learning_rate'], max_depth = params['max_depth'])
+    model.fit(df[features], df[params['target']], monitor = monitor)
+    return model, grad_boost_reg_summary(model, features)
+
+def fit_hist_grad_boost_reg(df, params, context):
+    features = params['features']
+    model = HistGradientBoostingRegressor(
+        max_iter = params['n_trees'],
+        learning_rate = params['learning_rate'],
+        max_depth = params['max_depth'],
+        early_stopping = True,
+        scoring = 'loss',
+        validation_fraction = params.get('validation_fraction', 0.1),
+        n_iter_no_change = params.get('n_iter_no_change', 10)
+    )
+    model.fit(df[features], df[params['target']])
+    return model, grad_boost_reg_summary(model, features)
+
+def label_dtype(n_clusters):
+    return np.int8 if n_clusters <= np.iinfo(np.int8).max else np.int32
+
+def k_means_entry(model, features, points, labels):
+    points = np.ascontiguousarray(points, dtype = np.float64)
+    labels = np.asarray(labels).astype(label_dtype(model.n_clusters))
+    return {
+        'model': model,
+        'features': list(features),
+        'points': points,
+        'labels': labels,
+        'statistics': cluster_statistics(points, labels, model.cluster_centers_)
+    }
+
+def new_dataset_frame(trained):
+    if trained['points'] is None:
+        blob = pinned_blob(trained['source'], trained.get('source_generation'))
+        new_df = shared_dataset_cache().table(blob, trained['features']).to_pandas()
+        if len(new_df) != len(trained['labels']):
+            raise DatasetChangedError('dataset has changed since the model was trained')
+    else:
+        new_df = pd.DataFrame(trained['points'], columns = trained['features'])
+    new_df['cluster'] = trained['labels']
+    return new_df
+
+def labelled_result(trained, labels_only = False):
+    if labels_only:
+        return {'labels': trained['labels']}
+    return {'new_dataset': new_dataset_frame(trained)}
+
+def fit_k_means(df, params, context):
+    features = params['features']
+    x = df[features]
+    model = KMeans(n_clusters = params['n_clusters'])
+    labels = model.fit_predict(x)
+    trained = k_means_entry(model, features, x.to_numpy(), labels)
+
+    result = k_means_summary(model, features, trained['statistics'])
+    result.update(labelled_result(trained, params.get('labels_only', False)))
+    return trained, result
+
+def fit_k_means_streaming(source, params, context):
+    features = params['features']
+    n_clusters = params['n_clusters']
+    # labels are kept instead of the points, so record which version of the dataset they belong to
+    blob = get_blob(source[1], source[2])
+    table = shared_dataset_cache().table(blob, features)
+    chunk_rows = max(int(params.get('batch_size') or 10000), n_clusters)
+    n_passes = int(params.get('max_passes') or 3)
+    if table.num_rows < n_clusters:
+        raise ValueError('dataset has fewer rows than n_clusters')
+
+    model = MiniBatchKMeans(n_clusters = n_clusters, batch_size = chunk_rows, n_init = 3)
+    offsets = np.arange(0, table.num_rows, chunk_rows)
+    total_steps = (n_passes + 1) * len(offsets)
+    step = 0
+    rng = np.random.default_rng()
+    for pass_index in range(n_passes):
+        order = rng.permutation(offsets)
+        if pass_index == 0:
+            # centers are initialised from the first chunk, so start on a full one
+            order = np.concatenate([[0], order[order != 0]])
+        for offset in order:
+            if context.cancelled():
+                raise RuntimeError('job cancelled')
+            model.partial_fit(read_chunk(table, offset, chunk_rows))
+            step += 1
+            context.report(step / total_steps, phase = 'fit', passes = pass_index)
+
+    accumulator = ClusterAccumulator(model.cluster_centers_)
+    labels = np.empty(table.num_rows, dtype = label_dtype(n_clusters))
+    for offset in offsets:
+        x = read_chunk(table, offset, chunk_rows)
+        chunk_labels = model.predict(x)
+        labels[offset:offset + len(chunk_labels)] = chunk_labels
+        accumulator.add(x.to_numpy(), chunk_labels)
+        step += 1
+        context.report(step / total_steps, phase = 'label')
+
+    trained = {
+        'model': model,
+        'features': list(features),
+        'points': None,
+        'source': source,
+        'source_generation': blob.generation,
+        'labels': labels,
+        'statistics': accumulator.statistics()
+    }
+    result = k_means_summary(model, features, trained['statistics'])
+    result['n_samples'] = int(table.num_rows)
+    if params.get('labels_only'):
+        result['labels'] = labels
+    return trained, result
+
+def chunk_order(table, chunk_rows, shuffle = False, rng = None):
+    offsets = np.arange(0, table.num_rows, chunk_rows)
+    return rng.permutation(offsets) if shuffle else offsets
+
+def fit_lin_reg_streaming(source, params, context):
+    features = params['features']
+    target = params['target']
+    table = load_table(source, features + [target])
+    chunk_rows = int(params.get('batch_size') or 100000)
+    offsets = chunk_order(table, chunk_rows)
+
+    # normal equations on [x - shift, 1], shifted by the first chunk's means for conditioning
+    n_features = len(features)
+    gram = np.zeros((n_features + 1, n_features + 1))
+    moment = np.zeros(n_features + 1)
+    x_shift = y_shift = None
+    for step, offset in enumerate(offsets):
+        if context.cancelled():
+            raise RuntimeError('job cancelled')
+        chunk = read_chunk(table, offset, chunk_rows)
+        x = chunk[features].to_numpy(dtype = np.float64)
+        y = chunk[target].to_numpy(dtype = np.float64)
+        if not (np.isfinite(x).all() and np.isfinite(y).all()):
+            raise ValueError('Input contains NaN or infinity')
+        if x_shift is None:
+            x_shift = x.mean(axis = 0)
+            y_shift = y.mean()
+
+        augmented = np.empty((len(x), n_features + 1))
+        augmented[:, :n_features] = x - x_shift
+        augmented[:, n_features] = 1.0
+        gram += augmented.T @ augmented
+        moment += augmented.T @ (y - y_shift)
+        context.report((step + 1) / len(offsets))
+
+    solution = np.linalg.lstsq(gram, moment, rcond = None)[0]
+    model = LinearRegression()
+    model.coef_ = solution[:n_features]
+    model.intercept_ = float(solution[n_features] + y_shift - x_shift @ model.coef_)
+    model.n_features_in_ = n_features
+    model.feature_names_in_ = np.asarray(features, dtype = object)
+    return model, lin_reg_summary(model, features)
+
+def fit_log_reg_streaming(source, params, context):
+    features = params['features']
+    target = params['target']
+    table = load_table(source, features + [target])
+    chunk_rows = int(params.get('batch_size') or 100000)
+    n_passes = int(params.get('max_passes') or 5)
+    offsets = chunk_order(table, chunk_rows)
+    total_steps = (n_passes + 1) * len(offsets)
+
+    # first pass: class labels and per-feature moments for standardisation
+    classes = set()
+    sums = np.zeros(len(features))
+    squares = np.zeros(len(features))
+    for step, offset in enumerate(offsets):
+        chunk = read_chunk(table, offset, chunk_rows)
+        x = chunk[features].to_numpy(dtype = np.float64)
+        sums += x.sum(axis = 0)
+        squares += (x ** 2).sum(axis = 0)
+        classes.update(chunk[target].dropna().unique().tolist())
+        context.report((step + 1) / total_steps, phase = 'scan')
+    if len(classes) < 2:
+        raise ValueError('target must have at least two classes')
+
+    mean = sums / table.num_rows
+    scale = np.sqrt(np.maximum(squares / table.num_rows - mean ** 2, 0))
+    scale[scale == 0] = 1.0
+
+    model = SGDClassifier(loss = 'log_loss')
+    classes = np.array(sorted(classes))
+    rng = np.random.default_rng()
+    step = len(offsets)
+    for pass_index in range(n_passes):
+        for offset in chunk_order(table, chunk_rows, shuffle = True, rng = rng):
+            if context.cancelled():
+                raise RuntimeError('job cancelled')
+            chunk = read_chunk(table, offset, chunk_rows)
+            rows = rng.permutation(len(chunk))
+            x = (chunk[features].to_numpy(dtype = np.float64)[rows] - mean) / scale
+            model.partial_fit(x, chunk[target].to_numpy()[rows], classes = classes)
+            step += 1
+            context.report(step / total_steps, phase = 'fit', passes = pass_index)
+
+    # fold the standardisation back in so the model scores raw feature values
+    model.coef_ = model.coef_ / scale
+    model.intercept_ = model.intercept_ - model.coef_ @ mean
+    model.feature_names_in_ = np.asarray(features, dtype = object)
+    return model, log_reg_summary(model, features)
+
+streaming_fitters = {
+    'lin_reg': fit_lin_reg_streaming,
+    'log_reg': fit_log_reg_streaming,
+    'k_means': fit_k_means_streaming
+}
+
+fitters = {
+    'lin_reg': fit_lin_reg,
+    'log_reg': fit_log_reg,
+    'random_forest': fit_random_forest,
+    'grad_boost_reg': fit_grad_boost_reg,
+    'k_means': fit_k_means
+}
+
+def run(algo_name, source, params, context = None):
+    context = context or NullContext()
+    if params.get('mode') == 'streaming':
+        entry, result = streaming_fitters[algo_name](source, params, context)
+    else:
+        df = load_source(source)
+        if context.cancelled():
+            raise RuntimeError('job cancelled')
+        entry, result = fitters[algo_name](df, params, context)
+    if not context.cancelled():
+        context.report(1.0)
+    return entry, result
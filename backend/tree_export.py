@@ -0,0 +1,107 @@
+import numpy as np
+from sklearn.ensemble import HistGradientBoostingRegressor
+
+
+class HistTree:
+    """One HistGradientBoosting predictor exposed through the same arrays as a fitted sklearn tree."""
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def arrays(self):
+        nodes = self.nodes
+        is_leaf = nodes['is_leaf'].astype(bool)
+        return {
+            'children_left': np.where(is_leaf, -1, nodes['left'].astype(np.intp)),
+            'children_right': np.where(is_leaf, -1, nodes['right'].astype(np.intp)),
+            'feature': nodes['feature_idx'].astype(np.intp),
+            'threshold': nodes['num_threshold'].astype(np.float64),
+            'missing_go_to_left': nodes['missing_go_to_left'].astype(bool),
+            'value': nodes['value'].astype(np.float64),
+            'n_samples': nodes['count'].astype(np.int64),
+            'gain': np.where(is_leaf, 0.0, nodes['gain']).astype(np.float64)
+        }
+
+    def to_dot(self):
+        arrays = self.arrays()
+        lines = [
+            'digraph Tree {',
+            'node [shape=box, style="filled, rounded", color="black", fillcolor="#f2f2f2", fontname="helvetica"] ;',
+            'edge [fontname="helvetica"] ;'
+        ]
+        for node in range(len(arrays['children_left'])):
+            left = arrays['children_left'][node]
+            label = f"samples = {arrays['n_samples'][node]}\\nvalue = {arrays['value'][node]:.3f}"
+            if left != -1:
+                label = f"x[{arrays['feature'][node]}] <= {arrays['threshold'][node]:.3f}\\n" + label
+            lines.append(f'{node} [label="{label}"] ;')
+            if left != -1:
+                lines.append(f'{node} -> {left} [labeldistance=2.5, labelangle=45, headlabel="True"] ;')
+                lines.append(f'{node} -> {arrays["children_right"][node]} [labeldistance=2.5, labelangle=-45, headlabel="False"] ;')
+        lines.append('}')
+        return '\n'.join(lines)
+
+
+def boosting_trees(model):
+    if isinstance(model, HistGradientBoostingRegressor):
+        # one predictor per iteration for single-output regression
+        return [HistTree(predictors[0].nodes) for predictors in model._predictors]
+    return list(model.estimators_[:, 0])
+
+def tree_arrays(estimator):
+    if isinstance(estimator, HistTree):
+        return estimator.arrays()
+
+    tree = estimator.tree_
+    value = tree.value[:, 0, :]
+    return {
+        'children_left': tree.children_left,
+        'children_right': tree.children_right,
+        'feature': tree.feature,
+        'threshold': tree.threshold,
+        'value': value[:, 0] if value.shape[1] == 1 else value,
+        'n_samples': tree.n_node_samples,
+        'impurity': tree.impurity
+    }
+
+def tree_structure(arrays, root = 0, max_depth = None):
+    """Nodes reachable from root within max_depth levels, as parallel arrays.
+
+    Node ids are the tree's own ids, so a node flagged expandable can be
+    passed back as the next root to fetch its subtree.
+    """
+    children_left = arrays['children_left']
+    children_right = arrays['children_right']
+    if root < 0 or root >= len(children_left):
+        raise IndexError(f"node {root} is not in the tree")
+
+    levels = []
+    frontier = np.array([root])
+    depth = 0
+    while frontier.size:
+        levels.append((frontier, depth))
+        if max_depth is not None and depth >= max_depth:
+            break
+        internal = frontier[children_left[frontier] != -1]
+        frontier = np.stack([children_left[internal], children_right[internal]], axis = 1).ravel()
+        depth += 1
+
+    nodes = np.concatenate([level for level, _ in levels])
+    depths = np.concatenate([np.full(len(level), level_depth) for level, level_depth in levels])
+    is_leaf = children_left[nodes] == -1
+    expandable = ~is_leaf & (depths >= max_depth) if max_depth is not None else np.zeros(len(nodes), dtype = bool)
+    threshold = arrays['threshold'][nodes]
+
+    structure = {
+        'node': nodes.tolist(),
+        'depth': depths.tolist(),
+        'feature': np.where(is_leaf, -1, arrays['feature'][nodes]).tolist(),
+        'threshold': [None if leaf else value for leaf, value in zip(is_leaf.tolist(), threshold.tolist())],
+        'left': children_left[nodes].tolist(),
+        'right': children_right[nodes].tolist(),
+        'expandable': expandable.tolist()
+    }
+    for field in ('value', 'n_samples', 'impurity', 'gain', 'missing_go_to_left'):
+        if field in arrays:
+            structure[field] = arrays[field][nodes].tolist()
+    return structure
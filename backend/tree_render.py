@@ -0,0 +1,100 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pydotplus
+from PIL import Image
+from sklearn.tree import export_graphviz
+
+from disk_cache import MemoryLRU
+from tree_export import HistTree
+
+formats = ('base64', 'png', 'svg')
+
+def render_tree(tree, size, image_format):
+    if isinstance(tree, HistTree):
+        dot_data = tree.to_dot()
+    else:
+        dot_data = export_graphviz(tree, out_file = None, filled = True, rounded = True)
+    graph = pydotplus.graph_from_dot_data(dot_data)
+    if image_format == 'svg':
+        return graph.create_svg()
+
+    png_image = graph.create_png()
+
+    # Resize the image to a more manageable size
+    image = Image.open(io.BytesIO(png_image))
+    image = image.resize(size, Image.Resampling.LANCZOS)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format = 'PNG')
+    return buffer.getvalue()
+
+
+class TreeRenderCache:
+    """Rendered tree images keyed by model version, tree index, size and format.
+
+    A request renders its tree in the calling thread (or waits on a render
+    already in flight) and then queues neighbouring trees on a small
+    thread pool, so paging through a forest mostly hits the cache.
+    """
+
+    def __init__(self, max_bytes, prefetch_radius = 2, workers = 2):
+        self.prefetch_radius = prefetch_radius
+        self.images = MemoryLRU(max_bytes)
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers = workers, thread_name_prefix = 'tree-render')
+
+    def get(self, model_key, trees, tree_index, size, image_format):
+        key = (model_key, tree_index, size, 'svg' if image_format == 'svg' else 'png')
+        image = self.render(key, trees[tree_index - 1])
+        self.prefetch(model_key, trees, tree_index, size, key[3])
+        return image
+
+    def render(self, key, tree):
+        with self.lock:
+            image = self.images.get(key)
+            if image is not None:
+                return image
+            event = self.pending.get(key)
+            leader = event is None
+            if leader:
+                event = self.pending[key] = threading.Event()
+
+        if not leader:
+            event.wait()
+            with self.lock:
+                image = self.images.get(key)
+            if image is not None:
+                return image
+            return self.render(key, tree)
+
+        try:
+            image = render_tree(tree, key[2], key[3])
+            self.store(key, image)
+            return image
+        finally:
+            with self.lock:
+                self.pending.pop(key, None)
+            event.set()
+
+    def store(self, key, image):
+        self.images.put(key, image, len(image))
+
+    def prefetch(self, model_key, trees, tree_index, size, image_format):
+        for offset in range(1, self.prefetch_radius + 1):
+            for neighbour in (tree_index + offset, tree_index - offset):
+                if neighbour < 1 or neighbour > len(trees):
+                    continue
+                key = (model_key, neighbour, size, image_format)
+                with self.lock:
+                    if key in self.images or key in self.pending:
+                        continue
+                self.executor.submit(self.quiet_render, key, trees[neighbour - 1])
+
+    def quiet_render(self, key, tree):
+        try:
+            self.render(key, tree)
+        except Exception:
+            pass